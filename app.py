@@ -1,19 +1,33 @@
-from flask import Flask, request, jsonify, send_file, render_template, redirect, url_for, flash
+from flask import Flask, request, jsonify, send_file, render_template, redirect, url_for, flash, Response, stream_with_context
 import tempfile
 import uuid
 import shutil
 from pathlib import Path
 import logging
+import json
+import os
+import threading
 
 from utils import (
     validate_youtube_url,
     check_tools,
-    download_youtube_audio,
-    extract_segment,
-    apply_fades,
-    get_audio_duration,
-    concatenate_audio,
-    create_overlapping_mixtape
+    render_mixtape,
+    MIX_ENGINE,
+    MIX_ENGINES,
+    HAS_NUMPY,
+    JobQueue,
+    TempDirSweeper,
+    TOOL_REGISTRY,
+    get_video_info as lookup_video_info,
+    get_video_info_stats,
+    get_download_backend_stats,
+    get_pipeline_stats,
+    get_ffmpeg_stats,
+    iter_video_info,
+    VIDEO_INFO_BATCH_LIMIT,
+    get_driver_pool_stats,
+    warm_driver_pool,
+    get_track_cache_stats
 )
 
 app = Flask(__name__)
@@ -25,6 +39,51 @@ logger = logging.getLogger(__name__)
 TEMP_DIR = Path("temp")
 TEMP_DIR.mkdir(exist_ok=True)
 
+# Detect ffmpeg/yt-dlp/Chrome once at startup; page views read the cached result
+TOOL_REGISTRY.refresh()
+
+JOB_QUEUE = JobQueue()
+JOB_EVENTS_KEEPALIVE = 15  # seconds between SSE comments so idle proxies keep the stream open
+TEMP_SWEEPER = TempDirSweeper(TEMP_DIR, is_active=JOB_QUEUE.is_active)
+
+_background_lock = threading.Lock()
+_background_started = False
+
+def start_background_services():
+    """Pre-start the Chrome driver pool and the temp sweeper once, in the process that serves requests"""
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    warm_driver_pool()
+    TEMP_SWEEPER.start()
+
+@app.before_request
+def ensure_background_services():
+    # WSGI servers import the app without running __main__, so start on the first request there
+    start_background_services()
+
+def wants_json():
+    """Whether the client asked for JSON rather than an HTML page"""
+    best = request.accept_mimetypes.best_match(['text/html', 'application/json'])
+    return request.is_json or best == 'application/json'
+
+def build_mixtape(session_id, songs, engine):
+    """Background job: render the songs into TEMP_DIR/<session_id>/final_mixtape.mp3"""
+    session_dir = TEMP_DIR / session_id
+    session_dir.mkdir(exist_ok=True)
+    job = JOB_QUEUE.get(session_id)
+    
+    try:
+        # Create the final mixtape with overlapping fades
+        final_mixtape = session_dir / "final_mixtape.mp3"
+        render_mixtape(songs, session_dir, final_mixtape, engine=engine, progress=job.report if job else None)
+        return session_id
+    except Exception:
+        shutil.rmtree(session_dir, ignore_errors=True)
+        raise
+
 @app.route('/')
 def index():
     """Main page - shows the mixtape creation form"""
@@ -33,7 +92,13 @@ def index():
 
 @app.route('/create', methods=['POST'])
 def create_mixtape():
-    """Process the mixtape creation request"""
+    """Validate the mixtape request and queue it for the background workers"""
+    def reject(message):
+        if wants_json():
+            return {'success': False, 'error': message}, 400
+        flash(message, 'error')
+        return redirect(url_for('index'))
+    
     try:
         # Parse songs from form data
         songs = []
@@ -50,84 +115,113 @@ def create_mixtape():
                 })
             i += 1
         
+        engine = request.form.get('engine', MIX_ENGINE)
+        
         # Validate input
         if not songs:
-            flash('Please add at least one song with a YouTube URL', 'error')
-            return redirect(url_for('index'))
+            return reject('Please add at least one song with a YouTube URL')
+        
+        if engine not in MIX_ENGINES or (engine == 'numpy' and not HAS_NUMPY):
+            return reject(f'Mixing engine not available: {engine}')
         
         for i, song in enumerate(songs):
             if not validate_youtube_url(song['youtubeUrl']):
-                flash(f'Invalid YouTube URL for song {i+1}', 'error')
-                return redirect(url_for('index'))
+                return reject(f'Invalid YouTube URL for song {i+1}')
             
             if song['endTime'] <= song['startTime']:
-                flash(f'End time must be greater than start time for song {i+1}', 'error')
-                return redirect(url_for('index'))
+                return reject(f'End time must be greater than start time for song {i+1}')
         
-        # Create session directory
+        # The job ID doubles as the session ID of the finished mixtape; an
+        # identical request that is still in progress (e.g. a user retrying)
+        # gets the existing job back
         session_id = uuid.uuid4().hex
-        session_dir = TEMP_DIR / session_id
-        session_dir.mkdir(exist_ok=True)
+        key = json.dumps({'songs': songs, 'engine': engine}, sort_keys=True)
+        job = JOB_QUEUE.submit(build_mixtape, session_id, songs, engine, job_id=session_id, key=key)
         
-        processed_files = []
-        fade_info = []
-        
-        try:
-            # Process each song
-            for i, song in enumerate(songs):
-                # Download audio
-                download_path = session_dir / f"download_{i}"
-                downloaded_file = download_youtube_audio(song['youtubeUrl'], download_path)
-                
-                if not downloaded_file.exists() or downloaded_file.stat().st_size == 0:
-                    raise Exception(f"Download failed for song {i+1}")
-                
-                # Extract segment
-                start_time = max(0, song['startTime'])
-                end_time = song['endTime']
-                segment_duration = end_time - start_time
-                
-                segment_file = session_dir / f"segment_{i}.mp3"
-                extract_segment(downloaded_file, segment_file, start_time, segment_duration)
-                
-                if not segment_file.exists():
-                    raise Exception(f"Segment extraction failed for song {i+1}")
-                
-                processed_files.append(segment_file)
-                fade_info.append({
-                    'fadeIn': song['fadeIn'],
-                    'fadeOut': song['fadeOut']
-                })
-                
-                # Clean up downloaded file
-                if downloaded_file.exists():
-                    downloaded_file.unlink()
-            
-            # Create the final mixtape with overlapping fades
-            final_mixtape = session_dir / "final_mixtape.mp3"
-            
-            for f in processed_files:
-                if not f.exists():
-                    raise Exception(f"Processed file missing: {f}")
-            
-            create_overlapping_mixtape(processed_files, fade_info, final_mixtape, overlap_duration=3.0)
-            
-            # Clean up segment files
-            for f in processed_files:
-                if f.exists():
-                    f.unlink()
-            
-            flash('🎉 Your mixtape has been created successfully!', 'success')
-            return redirect(url_for('download_page', session_id=session_id))
-            
-        except Exception as e:
-            shutil.rmtree(session_dir, ignore_errors=True)
-            raise e
+        if wants_json():
+            return {
+                'success': True,
+                'job_id': job.id,
+                'status_url': url_for('job_status', job_id=job.id),
+                'events_url': url_for('job_events', job_id=job.id),
+                'result_url': url_for('job_result', job_id=job.id)
+            }, 202
+        return redirect(url_for('job_page', job_id=job.id))
             
     except Exception as e:
         logger.error(f"Error creating mixtape: {str(e)}")
-        flash(f'Error creating mixtape: {str(e)}', 'error')
+        return reject(f'Error creating mixtape: {str(e)}')
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Current state of a queued mixtape job"""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return {'success': False, 'error': 'Job not found'}, 404
+    
+    status = job.to_dict()
+    if job.status == 'done':
+        status['result_url'] = url_for('job_result', job_id=job.id)
+        status['success_url'] = url_for('download_page', session_id=job.result)
+    return {'success': True, 'job': status}
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events stream of a job's progress, ending once it is done or failed"""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return {'success': False, 'error': 'Job not found'}, 404
+    
+    # Reconnecting EventSources resume after the last event they saw
+    after = request.headers.get('Last-Event-ID', 0, type=int)
+    
+    def reported_final():
+        # job.finished flips just before the done/failed event is recorded, so go by the events
+        return bool(job.events) and job.events[-1]['stage'] in ('done', 'failed')
+    
+    def generate():
+        last = after
+        while True:
+            events = job.wait_events(last, timeout=0 if reported_final() else JOB_EVENTS_KEEPALIVE)
+            if not events:
+                if reported_final():
+                    # Resumed at (or past) the final event - nothing more will come
+                    return
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                last = event['seq']
+                if event['stage'] == 'done':
+                    event = dict(event, success_url=url_for('download_page', session_id=job.result))
+                yield f"id: {event['seq']}\ndata: {json.dumps(event)}\n\n"
+            if events[-1]['stage'] in ('done', 'failed'):
+                return
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """The finished mixtape of a job"""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return {'success': False, 'error': 'Job not found'}, 404
+    if job.status == 'failed':
+        return {'success': False, 'error': job.error}, 500
+    if job.status != 'done':
+        return {'success': False, 'error': f'Job is {job.status}'}, 409
+    return redirect(url_for('download_mixtape', session_id=job.result))
+
+@app.route('/jobs/<job_id>/view')
+def job_page(job_id):
+    """Page that waits for a job and forwards to the success page"""
+    if JOB_QUEUE.get(job_id) is None:
+        flash('Mixtape job not found or expired', 'error')
         return redirect(url_for('index'))
+    return render_template('job.html', job_id=job_id)
 
 @app.route('/download/<session_id>')
 def download_mixtape(session_id):
@@ -163,44 +257,82 @@ def download_page(session_id):
     
     return render_template('success.html', session_id=session_id)
 
+def video_info_response(info):
+    """Shape looked-up video info for the UI"""
+    duration = info['duration']
+    return {
+        'success': True,
+        'title': info['title'],
+        'duration': duration,
+        'uploader': info['uploader'],
+        'duration_formatted': f"{duration // 60}:{duration % 60:02d}" if duration else "Unknown",
+        'source': info.get('source')
+    }
+
 @app.route('/get_video_info', methods=['POST'])
 def get_video_info():
     """Get YouTube video information using yt-dlp"""
     try:
-        import yt_dlp
-        
         data = request.get_json()
         url = data.get('url', '').strip()
         
         if not url or not validate_youtube_url(url):
             return {'success': False, 'error': 'Invalid YouTube URL'}, 400
         
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            
-            title = info.get('title', 'Unknown Title')
-            duration = info.get('duration', 0)
-            uploader = info.get('uploader', 'Unknown')
-            
-            return {
-                'success': True,
-                'title': title,
-                'duration': duration,
-                'uploader': uploader,
-                'duration_formatted': f"{duration // 60}:{duration % 60:02d}" if duration else "Unknown"
-            }
+        return video_info_response(lookup_video_info(url))
             
     except ImportError:
         return {'success': False, 'error': 'yt-dlp not available'}, 400
     except Exception as e:
         return {'success': False, 'error': str(e)}, 400
 
+@app.route('/get_video_info_batch', methods=['POST'])
+def get_video_info_batch():
+    """Look up a whole playlist, streaming one JSON line per URL as it resolves"""
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+    
+    if not isinstance(urls, list) or not urls:
+        return {'success': False, 'error': 'Expected a non-empty list of URLs'}, 400
+    if len(urls) > VIDEO_INFO_BATCH_LIMIT:
+        return {'success': False, 'error': f'At most {VIDEO_INFO_BATCH_LIMIT} URLs per batch'}, 400
+    
+    urls = [str(url).strip() for url in urls]
+    valid = [i for i, url in enumerate(urls) if validate_youtube_url(url)]
+    
+    def generate():
+        for i, url in enumerate(urls):
+            if i not in valid:
+                yield json.dumps({'index': i, 'url': url, 'success': False, 'error': 'Invalid YouTube URL'}) + '\n'
+        
+        for n, info, error in iter_video_info([urls[i] for i in valid]):
+            i = valid[n]
+            if error is None:
+                line = video_info_response(info)
+            elif isinstance(error, ImportError):
+                line = {'success': False, 'error': 'yt-dlp not available'}
+            else:
+                line = {'success': False, 'error': str(error)}
+            line.update({'index': i, 'url': urls[i]})
+            yield json.dumps(line) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/stats')
+def stats():
+    """Runtime stats for sizing the download and processing subsystems"""
+    return {
+        'driver_pool': get_driver_pool_stats(),
+        'track_cache': get_track_cache_stats(),
+        'jobs': JOB_QUEUE.stats(),
+        'temp_sweeper': TEMP_SWEEPER.stats(),
+        'tools': TOOL_REGISTRY.snapshot(),
+        'video_info': get_video_info_stats(),
+        'download_backends': get_download_backend_stats(),
+        'pipeline': get_pipeline_stats(),
+        'ffmpeg': get_ffmpeg_stats()
+    }
+
 if __name__ == '__main__':
     print("🎵 YouTube Mixtape Generator")
     print("=" * 40)
@@ -223,4 +355,9 @@ if __name__ == '__main__':
     print("🌐 Server: http://localhost:5000")
     print("=" * 40)
     
+    # The debug reloader re-runs this file in a child process that does the serving;
+    # only that child starts the background threads and browsers
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,35 @@
+"""
+Benchmark the mixing engines against each other on local audio files
+Usage: python benchmark.py song1.mp3 song2.mp3 ... [--overlap 3] [--fade 2]
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from utils import benchmark_mix_engines, HAS_NUMPY, MIX_ENGINES
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare mixing engine render times")
+    parser.add_argument('files', nargs='+', type=Path, help="Audio segments to mix, in order")
+    parser.add_argument('--overlap', type=float, default=3.0, help="Crossfade length in seconds")
+    parser.add_argument('--fade', type=float, default=2.0, help="Fade in/out length in seconds")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per engine (best is reported)")
+    args = parser.parse_args()
+    
+    engines = [e for e in MIX_ENGINES if e != 'numpy' or HAS_NUMPY]
+    fade_durations = [{'fadeIn': args.fade, 'fadeOut': args.fade} for _ in args.files]
+    
+    best = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(args.repeat):
+            timings = benchmark_mix_engines(args.files, fade_durations, work_dir, args.overlap, engines)
+            for engine, seconds in timings.items():
+                best[engine] = min(seconds, best.get(engine, seconds))
+    
+    print(f"🎵 {len(args.files)} tracks, {args.overlap}s overlap, best of {args.repeat}")
+    for engine, seconds in best.items():
+        print(f"  {engine:>8}: {seconds:.3f}s")
+
+if __name__ == '__main__':
+    main()
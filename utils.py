@@ -8,7 +8,21 @@ import tempfile
 import uuid
 import time
 import shutil
+import threading
+import atexit
+import os
+import sys
+import signal
+import select
+import struct
+import json
+import queue
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
+from urllib.parse import urlparse, parse_qs
 import logging
 
 try:
@@ -23,54 +37,754 @@ try:
 except ImportError:
     HAS_SELENIUM = False
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 logger = logging.getLogger(__name__)
 
+CHROME_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Tool detection is cached and refreshed in the background this often
+TOOLS_REFRESH_INTERVAL = 600
+TOOL_DETECT_TIMEOUT = 10
+WANTED_ENCODERS = {'libmp3lame', 'flac', 'pcm_s16le', 'pcm_f32le'}
+WANTED_FILTERS = {'atrim', 'afade', 'acrossfade', 'aformat', 'asetpts', 'concat'}
+CHROME_BINARIES = [
+    'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+    r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+]
+
+# Driver pool sizing - browsers are expensive to start, so keep a few warm
+DRIVER_POOL_MIN_SIZE = 1           # started in the background at app startup, never expired
+DRIVER_POOL_MAX_SIZE = 3
+DRIVER_POOL_IDLE_TIMEOUT = 300     # seconds an idle driver is kept around
+DRIVER_POOL_MAX_USES = 20          # recycle a driver after this many downloads
+DRIVER_POOL_ACQUIRE_TIMEOUT = 120  # seconds to wait for a free driver
+DRIVER_POOL_SETUP_ATTEMPTS = 3     # browsers that may fail to configure before acquire gives up
+
+# On-disk cache of downloaded source tracks, keyed by YouTube video ID
+TRACK_CACHE_DIR = Path("cache")
+TRACK_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# How many songs of one mixtape are downloaded and extracted at the same time
+MAX_PARALLEL_DOWNLOADS = 3
+
+# Segment extraction runs as its own pipeline stage so downloads and ffmpeg
+# overlap; finished downloads wait in a bounded queue between the stages
+PIPELINE_EXTRACT_WORKERS = 2
+PIPELINE_QUEUE_SIZE = 2
+
+# Fetch only the selected window of a song with yt-dlp (plus some padding so
+# the cut lands safely outside it) when the full track isn't already cached
+RANGE_DOWNLOADS = True
+SECTION_PREROLL = 2.0
+SECTION_POSTROLL = 1.0
+SECTION_MERGE_GAP = 60.0  # songs from one video this close together share one ranged download
+
+# Download backends: a backend's circuit opens after this many consecutive
+# failures and is skipped until the reset timeout has passed
+BREAKER_FAILURE_THRESHOLD = 2
+BREAKER_RESET_TIMEOUT = 300
+BACKEND_STATS_WINDOW = 20          # recent downloads used for success rate/latency
+LOCAL_AUDIO_DIR = Path("library")  # pre-downloaded tracks named <video_id>.<ext>
+
+# Also serialise downloads of the same video across worker processes
+CROSS_PROCESS_DOWNLOAD_LOCKS = True
+
+# Hedged downloads: if the healthiest backend hasn't delivered after HEDGE_AFTER
+# seconds (None = its observed p90 latency), race the next one against it
+HEDGE_DOWNLOADS = False
+HEDGE_AFTER = None
+HEDGE_DEFAULT_DELAY = 30  # used until the primary has latency samples
+
+# Overall deadlines for a browser download to land on disk
+CNVMP3_DOWNLOAD_TIMEOUT = 90
+YTMP3_DOWNLOAD_TIMEOUT = 60
+
+# 'filtergraph' renders the whole mixtape in one ffmpeg pass; 'streaming'
+# pipes one decoder per song through the crossfade straight into a single
+# encoder; 'multipass' is the extract -> fade -> concat path and is used as
+# the fallback
+RENDER_MODE = 'filtergraph'
+# Neighbouring songs overlap by the outgoing fade-out or the incoming fade-in,
+# whichever is shorter, up to this many seconds (0 plays them back to back)
+MAX_CROSSFADE = 10
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes of PCM read from a decoder at a time
+
+# 'ffmpeg' mixes with ffmpeg filters; 'numpy' decodes once and mixes in-process
+MIX_ENGINE = 'ffmpeg'
+MIX_ENGINES = ['ffmpeg', 'numpy']
+
+# Raw PCM layout used by the NumPy engine
+PCM_SAMPLE_RATE = 44100
+PCM_CHANNELS = 2
+
+# 'fast' seeks on the input side (and stream-copies suitable MP3 sources);
+# 'accurate' decodes from the start of the file up to the segment
+EXTRACT_MODE = 'fast'
+STREAM_COPY_MIN_BITRATE = 192000
+
+# Format of the segments passed between processing steps. 'wav' (16-bit PCM)
+# and 'flac' (smaller on disk) are lossless, so the final MP3 is the only lossy
+# encode; 'mp3' is the old behaviour and lets suitable sources be stream-copied
+INTERMEDIATE_FORMAT = 'wav'
+
+# Encoder arguments by output suffix
+OUTPUT_CODECS = {
+    '.wav': ['-c:a', 'pcm_s16le'],
+    '.flac': ['-c:a', 'flac'],
+    '.mp3': ['-c:a', 'libmp3lame', '-b:a', '192k'],
+}
+
+# Every ffmpeg/ffprobe call goes through run_ffmpeg, which kills the process
+# group once the deadline passes and keeps only the tail of stderr
+FFMPEG_TIMEOUT = 900
+FFPROBE_TIMEOUT = 30
+FFMPEG_STDERR_LINES = 200
+FFMPEG_STDERR_LINE_BYTES = 1024  # longer stderr lines are cut
+
+# At most FFMPEG_SLOTS ffmpeg processes run at once across all worker
+# processes (coordinated through lock files in FFMPEG_SLOT_DIR), each told to
+# use FFMPEG_THREADS threads; None sizes both from the CPU count
+FFMPEG_SLOTS = None
+FFMPEG_THREADS = None
+FFMPEG_SLOT_DIR = Path(tempfile.gettempdir()) / "mixtape-ffmpeg-slots"
+
+# Every stream is normalised to this before mixing so filters can combine them
+MIX_FORMAT_FILTER = "aformat=sample_fmts=fltp:sample_rates=44100:channel_layouts=stereo"
+
+# Background workers rendering queued mixtapes
+JOB_WORKERS = 2
+JOB_HISTORY_SIZE = 500  # finished jobs kept around for status lookups
+JOB_EVENT_HISTORY = 200  # progress events kept per job for late subscribers
+
+# Temp directory garbage collection
+TEMP_TTL = 3600                   # finished mixtapes are kept for an hour
+TEMP_ORPHAN_GRACE = 1800          # unfinished sessions with no live job are abandoned after this
+TEMP_QUOTA_BYTES = 5 * 1024 ** 3  # oldest finished sessions are evicted above this
+TEMP_SWEEP_INTERVAL = 300
+
+# /get_video_info metadata cache and shared yt-dlp extractors
+VIDEO_INFO_TTL = 3600
+VIDEO_INFO_CACHE_SIZE = 1000
+VIDEO_INFO_EXTRACTORS = 8
+VIDEO_INFO_BATCH_WORKERS = 8
+VIDEO_INFO_BATCH_LIMIT = 100
+# Look metadata up on extractors told to skip everything the UI doesn't need
+# (player JS, per-client configs, extra player clients, DASH/HLS manifests,
+# format resolution) and fall back to a full extraction when a field is missing
+VIDEO_INFO_FAST = True
+VIDEO_INFO_FIELDS = ('title', 'duration', 'uploader')
+VIDEO_INFO_FAST_EXTRACTOR_ARGS = {
+    'youtube': {
+        # The web client's player response comes embedded in the watch page,
+        # so this is a single request per video
+        'player_client': ['web'],
+        'player_skip': ['js', 'configs'],
+        'skip': ['dash', 'hls', 'translated_subs'],
+    },
+}
+
+AUDIO_SUFFIXES = ['.mp3', '.m4a', '.wav', '.webm', '.mp4']
+MIN_DOWNLOAD_SIZE = 10240
+
 def validate_youtube_url(url):
     """Validate if the URL is a valid YouTube URL"""
     import re
     youtube_regex = r'^(https?://)?(www\.)?(youtube\.com/(watch\?v=|embed/)|youtu\.be/)[\w\-]+'
     return re.match(youtube_regex, url) is not None
 
-def check_tools():
-    """Check if required tools (FFMPEG and yt-dlp) are available"""
-    tools = {'ffmpeg': False, 'yt_dlp': False}
+def extract_video_id(url):
+    """Return the canonical YouTube video ID for url, or None if there isn't one"""
+    import re
+    if not re.match(r'^https?://', url):
+        url = f"https://{url}"
+    parsed = urlparse(url)
+    host = parsed.netloc.lower().split(':')[0]
+    if host.startswith('www.'):
+        host = host[4:]
+    if host.startswith('m.'):
+        host = host[2:]
+    
+    candidate = None
+    parts = [p for p in parsed.path.split('/') if p]
+    if host == 'youtu.be' and parts:
+        candidate = parts[0]
+    elif host in ('youtube.com', 'music.youtube.com'):
+        if parts[:1] == ['watch']:
+            candidate = parse_qs(parsed.query).get('v', [None])[0]
+        elif len(parts) >= 2 and parts[0] in ('embed', 'shorts', 'live', 'v'):
+            candidate = parts[1]
+    
+    if candidate and re.match(r'^[\w\-]{6,}$', candidate):
+        return candidate
+    return None
+
+def _run_tool(cmd):
+    """Run a detection command, returning its stdout or None if it isn't usable"""
     try:
-        result = subprocess.run(['ffmpeg', '-version'], capture_output=True)
-        tools['ffmpeg'] = result.returncode == 0
-    except FileNotFoundError:
-        pass
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=TOOL_DETECT_TIMEOUT)
+    except (FileNotFoundError, subprocess.TimeoutExpired, OSError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+def _parse_ffmpeg_listing(output, wanted):
+    """Pick the names in wanted out of `ffmpeg -encoders` / `ffmpeg -filters` output"""
+    found = set()
+    for line in (output or '').splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] in wanted:
+            found.add(parts[1])
+    return sorted(found)
+
+def detect_tools():
+    """Probe ffmpeg, ffprobe, yt-dlp and Chrome and describe what's available"""
+    tools = {
+        'ffmpeg': False,
+        'ffmpeg_version': None,
+        'encoders': [],
+        'filters': [],
+        'ffprobe': False,
+        'yt_dlp': False,
+        'yt_dlp_version': None,
+        'chrome': False,
+        'chrome_path': None,
+        'selenium': HAS_SELENIUM,
+        'numpy': HAS_NUMPY,
+    }
+    
+    version = _run_tool(['ffmpeg', '-version'])
+    if version is not None:
+        tools['ffmpeg'] = True
+        first_line = version.splitlines()[0] if version else ''
+        tools['ffmpeg_version'] = first_line.split()[2] if len(first_line.split()) > 2 else None
+        tools['encoders'] = _parse_ffmpeg_listing(_run_tool(['ffmpeg', '-hide_banner', '-encoders']), WANTED_ENCODERS)
+        tools['filters'] = _parse_ffmpeg_listing(_run_tool(['ffmpeg', '-hide_banner', '-filters']), WANTED_FILTERS)
+    
+    tools['ffprobe'] = _run_tool(['ffprobe', '-version']) is not None
     
     try:
         import yt_dlp
         tools['yt_dlp'] = True
+        tools['yt_dlp_version'] = yt_dlp.version.__version__
     except ImportError:
         pass
     
+    for name in CHROME_BINARIES:
+        path = shutil.which(name) or (name if os.path.isabs(name) and os.path.exists(name) else None)
+        if path:
+            tools['chrome'] = True
+            tools['chrome_path'] = path
+            break
+    
     return tools
 
-def download_youtube_audio_cnvmp3(url, output_path):
-    """Download YouTube audio using cnvmp3.com service"""
+class ToolRegistry:
+    """Caches detect_tools() so request handlers never spawn processes
+    
+    The first snapshot() (normally at startup) detects synchronously; after
+    that a stale snapshot is still served while a background thread refreshes it.
+    """
+    
+    def __init__(self, refresh_interval=TOOLS_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._tools = None
+        self._detected_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+    
+    def refresh(self):
+        """Detect tools now and store the result"""
+        tools = detect_tools()
+        with self._lock:
+            self._tools = tools
+            self._detected_at = time.time()
+            self._refreshing = False
+    
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Tool detection failed: {e}")
+            with self._lock:
+                self._refreshing = False
+    
+    def snapshot(self):
+        """Return the cached capabilities, scheduling a refresh if they're stale"""
+        with self._lock:
+            tools = self._tools
+            stale = time.time() - self._detected_at > self.refresh_interval
+            if tools is not None and stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_in_background, name="tool-refresh", daemon=True).start()
+        if tools is None:
+            self.refresh()
+            return self.snapshot()
+        snapshot = dict(tools)
+        snapshot['detected_at'] = self._detected_at
+        return snapshot
+
+TOOL_REGISTRY = ToolRegistry()
+
+def check_tools():
+    """Check if required tools (FFMPEG and yt-dlp) are available"""
+    return TOOL_REGISTRY.snapshot()
+
+# inotify(7) event bits
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+
+_libc = None
+
+def _inotify_watch(directory):
+    """Return a non-blocking inotify fd watching directory, or None if unsupported"""
+    global _libc
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        if _libc is None:
+            _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        wd = _libc.inotify_add_watch(fd, str(directory).encode(), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+class DownloadWatcher:
+    """Waits for a finished audio file to appear in a download directory
+    
+    Uses inotify on Linux so the downloader wakes as soon as the browser closes
+    or renames the file; elsewhere it falls back to polling the directory.
+    Create it before starting the download so no event is missed.
+    """
+    
+    def __init__(self, directory, poll_interval=1.0, rescan_interval=5.0):
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.initial_files = set(self.directory.glob("*"))
+        self._fd = _inotify_watch(self.directory)
+    
+    @property
+    def uses_inotify(self):
+        return self._fd is not None
+    
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _is_complete(self, file_path):
+        if file_path in self.initial_files:
+            return False
+        if file_path.suffix.lower() not in AUDIO_SUFFIXES:
+            return False
+        filename = file_path.name.lower()
+        if (filename.startswith('faded_') or filename.startswith('segment_') or
+                filename.startswith('download_') or filename == 'final_mixtape.mp3' or
+                filename.endswith('.crdownload')):
+            return False
+        try:
+            return file_path.is_file() and file_path.stat().st_size > MIN_DOWNLOAD_SIZE
+        except FileNotFoundError:
+            return False
+    
+    def _scan(self):
+        for file_path in self.directory.glob("*"):
+            if self._is_complete(file_path):
+                return file_path
+        return None
+    
+    def _read_events(self, timeout):
+        """Block up to timeout for inotify events; return the changed names or None on overflow"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        names = []
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buf):
+                _, mask, _, length = struct.unpack_from('iIII', buf, offset)
+                name = buf[offset + 16:offset + 16 + length].rstrip(b'\0')
+                offset += 16 + length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if name:
+                    names.append(os.fsdecode(name))
+        return names
+    
+    def wait(self, timeout, cancel=None):
+        """Return the completed download, or None once timeout seconds have passed"""
+        deadline = time.time() + timeout
+        found = self._scan()
+        last_scan = time.time()
+        while not found:
+            remaining = deadline - time.time()
+            if remaining <= 0 or (cancel is not None and cancel.is_set()):
+                return None
+            
+            if self._fd is None:
+                if cancel is not None:
+                    cancel.wait(min(self.poll_interval, remaining))
+                else:
+                    time.sleep(min(self.poll_interval, remaining))
+                found = self._scan()
+                continue
+            
+            # Wake at least once a second to notice cancellation
+            names = self._read_events(min(self.rescan_interval, remaining, 1.0 if cancel is not None else remaining))
+            if names is None or time.time() - last_scan >= self.rescan_interval:
+                # Queue overflowed or it's been quiet for a while - double check the directory
+                found = self._scan()
+                last_scan = time.time()
+                continue
+            for name in names:
+                file_path = self.directory / name
+                if self._is_complete(file_path):
+                    found = file_path
+                    break
+        return found
+
+class DownloadCancelled(Exception):
+    """Raised inside a backend when its download was cancelled (e.g. it lost a hedged race)"""
+
+def check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise DownloadCancelled("Download cancelled")
+
+def report_progress(progress, stage, **details):
+    """Pass a progress update to the progress callback, if there is one"""
+    if progress is not None:
+        progress(stage, **details)
+
+def cancellable_sleep(seconds, cancel):
+    """time.sleep that returns early (raising DownloadCancelled) once cancel is set"""
+    if cancel is None:
+        time.sleep(seconds)
+    elif cancel.wait(seconds):
+        raise DownloadCancelled("Download cancelled")
+
+def build_chrome_options():
+    """Build the headless Chrome options shared by all pooled drivers"""
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    chrome_options.add_argument(f"--user-agent={CHROME_USER_AGENT}")
     
-    temp_download_dir = str(output_path.parent.absolute())
     prefs = {
-        "download.default_directory": temp_download_dir,
         "download.prompt_for_download": False,
         "download.directory_upgrade": True,
         "safebrowsing.enabled": True
     }
     chrome_options.add_experimental_option("prefs", prefs)
+    return chrome_options
+
+class PooledDriver:
+    """A Chrome driver owned by the pool plus its bookkeeping"""
+    
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+
+class ChromeDriverPool:
+    """Pool of reusable headless Chrome drivers shared by the download backends"""
     
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    def __init__(self, min_size=DRIVER_POOL_MIN_SIZE, max_size=DRIVER_POOL_MAX_SIZE,
+                 idle_timeout=DRIVER_POOL_IDLE_TIMEOUT, max_uses=DRIVER_POOL_MAX_USES):
+        self.min_size = min_size
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses
+        self._idle = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._driver_path = None
+        self._reaper = None
+        self._stop = threading.Event()
+        self._counters = {
+            'created': 0,
+            'reused': 0,
+            'recycled': 0,
+            'expired': 0,
+            'unhealthy': 0,
+            'discarded': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+        }
     
-    try:
+    def _total(self):
+        return len(self._idle) + self._in_use
+    
+    def _create_driver(self):
+        if not HAS_SELENIUM:
+            raise Exception("Selenium not available. Install with: pip install selenium webdriver-manager")
+        if self._driver_path is None:
+            self._driver_path = ChromeDriverManager().install()
+        service = Service(self._driver_path)
+        driver = webdriver.Chrome(service=service, options=build_chrome_options())
+        with self._cond:
+            self._counters['created'] += 1
+        return PooledDriver(driver)
+    
+    def _is_healthy(self, entry):
+        try:
+            entry.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+    
+    def _quit(self, entry):
+        try:
+            entry.driver.quit()
+        except Exception:
+            pass
+    
+    def _set_download_dir(self, entry, download_dir):
+        """Point the browser's downloads at download_dir for this borrow"""
+        params = {"behavior": "allow", "downloadPath": str(Path(download_dir).absolute())}
+        try:
+            entry.driver.execute_cdp_cmd("Browser.setDownloadBehavior", params)
+        except Exception:
+            entry.driver.execute_cdp_cmd("Page.setDownloadBehavior", params)
+    
+    def _reset(self, entry):
+        """Close popups and blank the page so the next borrower starts clean"""
+        handles = entry.driver.window_handles
+        for handle in handles[1:]:
+            entry.driver.switch_to.window(handle)
+            entry.driver.close()
+        entry.driver.switch_to.window(handles[0])
+        entry.driver.get("about:blank")
+    
+    def _pop_expired(self):
+        """Remove idle drivers past idle_timeout (keeping min_size) and return them"""
+        now = time.time()
+        expired = []
+        keep = []
+        for entry in self._idle:
+            if now - entry.last_used > self.idle_timeout and self._total() - len(expired) > self.min_size:
+                expired.append(entry)
+            else:
+                keep.append(entry)
+        self._idle = keep
+        self._counters['expired'] += len(expired)
+        return expired
+    
+    def acquire(self, download_dir, timeout=DRIVER_POOL_ACQUIRE_TIMEOUT):
+        """Borrow a healthy driver whose downloads go to download_dir"""
+        deadline = time.time() + timeout
+        waited_since = None
+        failures = 0
+        while True:
+            if time.time() >= deadline:
+                raise Exception("Timed out waiting for a browser from the driver pool")
+            entry = None
+            create = False
+            with self._cond:
+                for stale in self._pop_expired():
+                    self._quit(stale)
+                while not self._idle and self._total() >= self.max_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise Exception("Timed out waiting for a browser from the driver pool")
+                    if waited_since is None:
+                        waited_since = time.time()
+                        self._counters['waits'] += 1
+                    self._cond.wait(remaining)
+                if waited_since is not None:
+                    self._counters['wait_time'] += time.time() - waited_since
+                    waited_since = None
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    create = True
+                self._in_use += 1
+            
+            if create:
+                try:
+                    entry = self._create_driver()
+                except Exception:
+                    with self._cond:
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(entry):
+                self._quit(entry)
+                with self._cond:
+                    self._counters['unhealthy'] += 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                continue
+            else:
+                with self._cond:
+                    self._counters['reused'] += 1
+            
+            try:
+                self._set_download_dir(entry, download_dir)
+            except Exception as e:
+                self.release(entry, discard=True)
+                failures += 1
+                if failures >= DRIVER_POOL_SETUP_ATTEMPTS:
+                    raise Exception(f"Could not configure a browser after {failures} attempts: {e}")
+                continue
+            entry.uses += 1
+            return entry
+    
+    def release(self, entry, discard=False):
+        """Return a borrowed driver, quitting it if broken or worn out"""
+        if discard:
+            with self._cond:
+                self._counters['discarded'] += 1
+        elif self.max_uses and entry.uses >= self.max_uses:
+            discard = True
+            with self._cond:
+                self._counters['recycled'] += 1
+        else:
+            try:
+                self._reset(entry)
+            except Exception:
+                discard = True
+        
+        if discard:
+            self._quit(entry)
+        
+        with self._cond:
+            self._in_use -= 1
+            if not discard:
+                entry.last_used = time.time()
+                self._idle.append(entry)
+            expired = self._pop_expired()
+            self._cond.notify()
+        for stale in expired:
+            self._quit(stale)
+    
+    @contextmanager
+    def driver(self, download_dir):
+        """Context manager that borrows a driver and returns it afterwards"""
+        entry = self.acquire(download_dir)
+        try:
+            yield entry.driver
+        except BaseException:
+            self.release(entry, discard=True)
+            raise
+        else:
+            self.release(entry)
+    
+    def warm(self):
+        """Start drivers until the pool holds min_size of them"""
+        while True:
+            with self._cond:
+                if self._total() >= self.min_size:
+                    return
+                self._in_use += 1
+            try:
+                entry = self._create_driver()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                raise
+            self.release(entry)
+    
+    def reap(self):
+        """Quit idle drivers past idle_timeout and return how many were quit"""
+        with self._cond:
+            expired = self._pop_expired()
+        for entry in expired:
+            self._quit(entry)
+        return len(expired)
+    
+    def start_reaper(self):
+        """Reap idle drivers on a daemon thread so they expire even when nobody borrows one"""
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, name="driver-pool-reaper", daemon=True)
+            self._reaper.start()
+    
+    def _reap_loop(self):
+        interval = max(1, min(self.idle_timeout, 60))
+        while not self._stop.wait(interval):
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"Driver pool reap failed: {e}")
+    
+    def close_all(self):
+        """Quit every idle driver (drivers in use are quit when returned)"""
+        self._stop.set()
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._quit(entry)
+    
+    def stats(self):
+        """Snapshot of pool size and usage counters"""
+        with self._cond:
+            stats = dict(self._counters)
+            stats.update({
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'total': self._total(),
+            })
+        stats['wait_time'] = round(stats['wait_time'], 3)
+        return stats
+
+DRIVER_POOL = ChromeDriverPool()
+atexit.register(DRIVER_POOL.close_all)
+
+def get_driver_pool_stats():
+    """Return the shared driver pool's stats"""
+    return DRIVER_POOL.stats()
+
+def warm_driver_pool():
+    """Start DRIVER_POOL's idle reaper and its min_size drivers on background threads so the first download skips the cold start"""
+    if not HAS_SELENIUM:
+        return
+    DRIVER_POOL.start_reaper()
+    if DRIVER_POOL.min_size <= 0:
+        return
+    
+    def warm():
+        try:
+            DRIVER_POOL.warm()
+            print(f"🔥 Driver pool warmed with {DRIVER_POOL.min_size} browser(s)")
+        except Exception as e:
+            logger.warning(f"Driver pool warm-up failed: {e}")
+    
+    threading.Thread(target=warm, name="driver-pool-warm", daemon=True).start()
+
+def download_youtube_audio_cnvmp3(url, output_path, timeout=CNVMP3_DOWNLOAD_TIMEOUT, cancel=None):
+    """Download YouTube audio using cnvmp3.com service"""
+    temp_dir = output_path.parent
+    
+    with DRIVER_POOL.driver(temp_dir) as driver, DownloadWatcher(temp_dir) as watcher:
         driver.get("https://cnvmp3.com/v33")
         WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "video-url")))
         
@@ -87,65 +801,34 @@ def download_youtube_audio_cnvmp3(url, output_path):
             except:
                 pass
         
-        temp_dir = output_path.parent
-        initial_files = set(temp_dir.glob("*"))
-        
         convert_button = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.ID, "convert-button-1"))
         )
+        check_cancelled(cancel)
         convert_button.click()
         
-        downloaded_file = None
-        for attempt in range(90):
-            time.sleep(1)
-            current_files = set(temp_dir.glob("*"))
-            new_files = current_files - initial_files
-            
-            for file_path in new_files:
-                if file_path.is_file() and file_path.suffix.lower() in ['.mp3', '.m4a', '.wav', '.webm', '.mp4']:
-                    filename = file_path.name.lower()
-                    if not (filename.startswith('faded_') or filename.startswith('segment_') or 
-                           filename.startswith('download_') or filename == 'final_mixtape.mp3' or
-                           filename.endswith('.crdownload')):
-                        if file_path.stat().st_size > 10240:
-                            downloaded_file = file_path
-                            break
-            
-            if downloaded_file:
-                break
-        
+        downloaded_file = watcher.wait(timeout, cancel)
+        check_cancelled(cancel)
         if not downloaded_file:
             raise Exception("cnvmp3 download failed")
-        
-        final_output_path = output_path.with_suffix(downloaded_file.suffix)
-        if downloaded_file != final_output_path:
-            shutil.move(str(downloaded_file), str(final_output_path))
-        
-        if final_output_path.stat().st_size == 0:
-            raise Exception("Downloaded file is empty")
-        
-        return final_output_path
-        
-    except Exception as e:
-        raise e
-    finally:
-        driver.quit()
+    
+    final_output_path = output_path.with_suffix(downloaded_file.suffix)
+    if downloaded_file != final_output_path:
+        shutil.move(str(downloaded_file), str(final_output_path))
+    
+    if final_output_path.stat().st_size == 0:
+        raise Exception("Downloaded file is empty")
+    
+    return final_output_path
 
-def download_youtube_audio_ytmp3(url, output_path):
+def download_youtube_audio_ytmp3(url, output_path, timeout=YTMP3_DOWNLOAD_TIMEOUT, cancel=None):
     """Download YouTube audio using ytmp3.as service as fallback"""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    temp_download_dir = str(output_path.parent.absolute())
     temp_dir = output_path.parent
     
+    # output_path's directory belongs to this download alone, so anything left
+    # over in it is from an earlier failed attempt
     for existing_file in temp_dir.glob("*"):
-        if existing_file.is_file() and existing_file.suffix.lower() in ['.mp3', '.m4a', '.wav', '.webm', '.mp4']:
+        if existing_file.is_file() and existing_file.suffix.lower() in AUDIO_SUFFIXES:
             filename = existing_file.name.lower()
             if not (filename.startswith('faded_') or filename.startswith('segment_') or 
                    filename.startswith('download_') or filename == 'final_mixtape.mp3'):
@@ -154,18 +837,7 @@ def download_youtube_audio_ytmp3(url, output_path):
                 except:
                     pass
     
-    prefs = {
-        "download.default_directory": temp_download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-    
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    
-    try:
+    with DRIVER_POOL.driver(temp_dir) as driver, DownloadWatcher(temp_dir) as watcher:
         driver.get("https://ytmp3.as/AOPR/")
         WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "v")))
         
@@ -177,7 +849,7 @@ def download_youtube_audio_ytmp3(url, output_path):
             EC.element_to_be_clickable((By.XPATH, "//button[@type='submit' or contains(text(), 'Convert')]"))
         )
         convert_button.click()
-        time.sleep(6)
+        cancellable_sleep(6, cancel)
         
         download_button = None
         for attempt in range(8):
@@ -191,168 +863,1193 @@ def download_youtube_audio_ytmp3(url, output_path):
                 
                 if download_button:
                     download_button.click()
-                    time.sleep(3)
                     break
-                time.sleep(5)
+                cancellable_sleep(5, cancel)
+            except DownloadCancelled:
+                raise
             except Exception:
-                time.sleep(5)
-        
-        if not download_button:
-            try:
-                driver.quit()
-            except:
-                pass
-            downloaded_file = download_youtube_audio_cnvmp3(url, output_path)
-            return downloaded_file
+                cancellable_sleep(5, cancel)
         
         downloaded_file = None
-        for attempt in range(60):
-            time.sleep(1)
-            current_files = list(temp_dir.glob("*"))
-            
-            for file_path in current_files:
-                if file_path.is_file() and file_path.suffix.lower() in ['.mp3', '.m4a', '.wav', '.webm', '.mp4']:
-                    filename = file_path.name.lower()
-                    if not (filename.startswith('faded_') or filename.startswith('segment_') or 
-                           filename.startswith('download_') or filename == 'final_mixtape.mp3' or
-                           filename.endswith('.crdownload')):
-                        
-                        if file_path.stat().st_size > 10240:
-                            downloaded_file = file_path
-                            break
-            
-            if downloaded_file:
-                break
-        
-        if not downloaded_file:
-            raise Exception("YTMP3 download failed")
-        
-        final_output_path = output_path.with_suffix(downloaded_file.suffix)
-        if downloaded_file != final_output_path:
-            shutil.move(str(downloaded_file), str(final_output_path))
-        
-        return final_output_path
-        
-    except Exception as e:
-        raise e
-    finally:
-        driver.quit()
+        if download_button:
+            downloaded_file = watcher.wait(timeout, cancel)
+            check_cancelled(cancel)
+            if not downloaded_file:
+                raise Exception("YTMP3 download failed")
+    
+    if not download_button:
+        raise Exception("YTMP3 download button never appeared")
+    
+    final_output_path = output_path.with_suffix(downloaded_file.suffix)
+    if downloaded_file != final_output_path:
+        shutil.move(str(downloaded_file), str(final_output_path))
+    
+    return final_output_path
 
-def download_youtube_audio(url, output_path):
-    """Main download function with cnvmp3 primary and YTMP3 fallback"""
-    if not HAS_SELENIUM:
-        raise Exception("Selenium not available. Install with: pip install selenium webdriver-manager")
+def download_youtube_audio_ytdlp(url, output_path, section=None, cancel=None):
+    """Download YouTube audio with yt-dlp, optionally only the (start, end) section in seconds"""
+    try:
+        import yt_dlp
+        from yt_dlp.utils import download_range_func
+    except ImportError:
+        raise Exception("yt-dlp not available. Install with: pip install yt-dlp")
     
-    print(f"🎵 Downloading: {url}")
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': f"{output_path}.%(ext)s",
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+    }
+    if section is not None:
+        ydl_opts['download_ranges'] = download_range_func(None, [section])
+    if cancel is not None:
+        ydl_opts['progress_hooks'] = [lambda status: check_cancelled(cancel)]
     
-    # Try cnvmp3.com (primary service) with 2 attempts
-    for attempt in range(2):
-        try:
-            if attempt > 0:
-                print(f"🔄 cnvmp3 retry attempt {attempt + 1}/2...")
-            else:
-                print("🔄 Trying cnvmp3.com (primary)...")
-            
-            downloaded_file = download_youtube_audio_cnvmp3(url, output_path)
-            print(f"✅ cnvmp3.com successful on attempt {attempt + 1}!")
-            return downloaded_file
-            
-        except Exception as cnv_error:
-            print(f"❌ cnvmp3 attempt {attempt + 1}/2 failed: {cnv_error}")
-            if attempt == 1:
-                print("🔄 cnvmp3 failed, trying YTMP3 fallback...")
-                break
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.download([url])
+    
+    for file_path in output_path.parent.glob(f"{output_path.name}.*"):
+        if file_path.suffix.lower() in AUDIO_SUFFIXES + ['.opus', '.ogg'] and file_path.stat().st_size > 0:
+            return file_path
+    raise Exception("yt-dlp download failed")
+
+def download_youtube_audio_local(url, output_path, cancel=None):
+    """Copy a pre-downloaded <video_id>.<ext> track from LOCAL_AUDIO_DIR"""
+    local_file = find_local_audio(url)
+    if local_file is None:
+        raise Exception("Track not in the local library")
     
-    # Fallback to YTMP3
+    final_output_path = output_path.with_suffix(local_file.suffix)
+    shutil.copyfile(local_file, final_output_path)
+    return final_output_path
+
+def find_local_audio(url):
+    """The local library file for url's video ID, or None"""
+    video_id = extract_video_id(url)
+    if video_id is None or not LOCAL_AUDIO_DIR.is_dir():
+        return None
+    for file_path in LOCAL_AUDIO_DIR.glob(f"{video_id}.*"):
+        if file_path.suffix.lower() in AUDIO_SUFFIXES and file_path.is_file():
+            return file_path
+    return None
+
+def _has_yt_dlp():
     try:
-        downloaded_file = download_youtube_audio_ytmp3(url, output_path)
-        print("✅ YTMP3 fallback successful!")
-        return downloaded_file
-    except Exception as ytmp3_error:
-        print(f"❌ YTMP3 fallback failed: {ytmp3_error}")
-        raise Exception(f"All services failed. cnvmp3: failed after 2 attempts, YTMP3: {ytmp3_error}")
-
-def extract_segment(input_file, output_file, start_time, duration):
-    """Extract a specific time segment from an audio file using FFMPEG"""
-    if not input_file.exists():
-        raise Exception(f"Input file does not exist: {input_file}")
+        import yt_dlp
+        return True
+    except ImportError:
+        return False
+
+class CircuitBreaker:
+    """Stops calling a backend after repeated failures
     
-    if input_file.stat().st_size == 0:
-        raise Exception(f"Input file is empty: {input_file}")
+    'closed' lets calls through; failure_threshold consecutive failures open it,
+    after which calls are refused until reset_timeout has passed. It then goes
+    'half_open' and lets a single trial call decide whether to close again.
+    """
     
-    cmd = [
-        'ffmpeg', '-i', str(input_file),
-        '-ss', str(start_time),
-        '-t', str(duration),
-        '-acodec', 'libmp3lame',
-        '-b:a', '192k',
-        '-y',
-        str(output_file)
-    ]
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.times_opened = 0
+        self._lock = threading.Lock()
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise Exception(f"FFMPEG segment extraction failed: {result.stderr}")
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
     
-    if not output_file.exists() or output_file.stat().st_size == 0:
-        raise Exception(f"Output file creation failed: {output_file}")
+    def allow(self):
+        """Whether a call may go through now (claims the trial slot when half open)"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
     
-    return output_file
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+    
+    def record_cancelled(self):
+        """Release the half-open trial slot without judging the backend"""
+        with self._lock:
+            self.trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_running:
+                    self.times_opened += 1
+                self.opened_at = time.time()
+            self.trial_running = False
 
-def apply_fades(input_file, output_file, fade_in, fade_out, total_duration):
-    """Apply fade in and fade out effects to an audio file"""
-    fade_out_start = max(0, total_duration - fade_out)
+class DownloadBackend:
+    """A download function with its own circuit breaker and rolling success/latency stats"""
     
-    filters = []
-    if fade_in > 0:
-        filters.append(f"afade=t=in:d={fade_in}")
-    if fade_out > 0:
-        filters.append(f"afade=t=out:st={fade_out_start}:d={fade_out}")
+    def __init__(self, name, func, attempts=1, available=None, expected_latency=float('inf')):
+        self.name = name
+        self.func = func
+        self.attempts = attempts
+        self.available = available or (lambda url: True)
+        self.expected_latency = expected_latency
+        self.breaker = CircuitBreaker()
+        self._outcomes = deque(maxlen=BACKEND_STATS_WINDOW)
+        self._lock = threading.Lock()
     
-    cmd = ['ffmpeg', '-i', str(input_file)]
+    def record(self, ok, seconds):
+        with self._lock:
+            self._outcomes.append((ok, seconds))
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
     
-    if filters:
-        cmd.extend(['-af', ','.join(filters)])
+    def success_rate(self):
+        with self._lock:
+            outcomes = list(self._outcomes)
+        if not outcomes:
+            return 1.0
+        return sum(1 for ok, _ in outcomes if ok) / len(outcomes)
     
-    cmd.extend([
-        '-acodec', 'libmp3lame',
-        '-b:a', '192k',
-        '-y',
-        str(output_file)
-    ])
+    def latency_percentile(self, percentile):
+        """Latency of successful downloads at the given percentile, or expected_latency with no data"""
+        with self._lock:
+            latencies = sorted(seconds for ok, seconds in self._outcomes if ok)
+        if not latencies:
+            return self.expected_latency
+        index = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+        return latencies[index]
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise Exception(f"FFMPEG fade failed: {result.stderr}")
+    def health_key(self):
+        """Sort key: closed breakers first, then success rate, then median latency"""
+        return (
+            self.breaker.state == 'open',
+            -round(self.success_rate(), 1),
+            self.latency_percentile(50),
+        )
     
-    return output_file
+    def stats(self):
+        with self._lock:
+            samples = len(self._outcomes)
+        p50 = self.latency_percentile(50)
+        p90 = self.latency_percentile(90)
+        return {
+            'state': self.breaker.state,
+            'times_opened': self.breaker.times_opened,
+            'success_rate': round(self.success_rate(), 3),
+            'samples': samples,
+            'p50_seconds': round(p50, 2) if p50 != float('inf') else None,
+            'p90_seconds': round(p90, 2) if p90 != float('inf') else None,
+        }
 
-def get_audio_duration(audio_file):
-    """Get the duration of an audio file in seconds"""
-    cmd = [
-        'ffprobe', '-v', 'quiet', '-show_entries', 'format=duration',
-        '-of', 'csv=p=0', str(audio_file)
-    ]
+class BackendRegistry:
+    """Download backends tried in order of observed health"""
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise Exception(f"Failed to get audio duration: {result.stderr}")
+    def __init__(self):
+        self._backends = []
     
-    try:
-        return float(result.stdout.strip())
-    except ValueError:
-        raise Exception(f"Invalid duration format: {result.stdout.strip()}")
-
-def concatenate_audio(input_files, output_file):
-    """Concatenate multiple audio files into one using FFMPEG with proper re-encoding"""
-    concat_file = output_file.parent / f"concat_{uuid.uuid4().hex}.txt"
+    def register(self, backend):
+        self._backends.append(backend)
+        return backend
     
-    with open(concat_file, 'w') as f:
-        for file_path in input_files:
-            f.write(f"file '{file_path.absolute()}'\n")
+    def get(self, name):
+        for backend in self._backends:
+            if backend.name == name:
+                return backend
+        return None
     
-    cmd = [
-        'ffmpeg', '-f', 'concat', '-safe', '0',
+    def ordered(self, url):
+        """Backends usable for url, healthiest first (registration order breaks ties)"""
+        usable = [b for b in self._backends if b.available(url)]
+        return sorted(usable, key=lambda b: b.health_key())
+    
+    def run(self, backend, url, output_path, cancel=None, progress=None, **options):
+        """Try one backend (up to its attempt count), recording every outcome
+        
+        options are passed on to the backend's download function (e.g. section for yt-dlp).
+        """
+        error = None
+        for attempt in range(backend.attempts):
+            check_cancelled(cancel)
+            if not backend.breaker.allow():
+                raise Exception(f"{backend.name} circuit open")
+            if attempt > 0:
+                print(f"🔄 {backend.name} retry attempt {attempt + 1}/{backend.attempts}...")
+            report_progress(progress, 'downloading', provider=backend.name, attempt=attempt + 1)
+            started = time.time()
+            try:
+                downloaded_file = backend.func(url, output_path, cancel=cancel, **options)
+            except Exception as e:
+                if cancel is not None and cancel.is_set():
+                    # Losing a race isn't the provider's fault
+                    backend.breaker.record_cancelled()
+                    raise DownloadCancelled(f"{backend.name} cancelled")
+                backend.record(False, time.time() - started)
+                print(f"❌ {backend.name} attempt {attempt + 1}/{backend.attempts} failed: {e}")
+                error = e
+                continue
+            backend.record(True, time.time() - started)
+            print(f"✅ {backend.name} successful on attempt {attempt + 1}!")
+            return downloaded_file
+        raise error
+    
+    def download(self, url, output_path, progress=None):
+        backends = self.ordered(url)
+        if not backends:
+            raise Exception("No download backend available. Install with: pip install selenium webdriver-manager yt-dlp")
+        
+        errors = []
+        for backend in backends:
+            if backend.breaker.state == 'open':
+                errors.append(f"{backend.name}: circuit open")
+                continue
+            print(f"🔄 Trying {backend.name}...")
+            try:
+                return self.run(backend, url, output_path, progress=progress)
+            except Exception as e:
+                errors.append(f"{backend.name}: {e}")
+        
+        raise Exception(f"All services failed. {'; '.join(errors)}")
+    
+    def download_hedged(self, url, output_path, hedge_after=None, progress=None):
+        """Start the healthiest backend, and a second one if no file arrives within hedge_after
+        
+        hedge_after defaults to the primary's observed p90 latency. The first
+        successful download wins and the other one is cancelled (which quits
+        its browser). Each racer downloads into its own subdirectory.
+        """
+        backends = [b for b in self.ordered(url) if b.breaker.state != 'open']
+        if len(backends) < 2:
+            return self.download(url, output_path, progress)
+        primary, secondary = backends[0], backends[1]
+        
+        if hedge_after is None:
+            hedge_after = primary.latency_percentile(90)
+            if hedge_after == float('inf'):
+                hedge_after = HEDGE_DEFAULT_DELAY
+        
+        results = queue.Queue()
+        cancels = {}
+        
+        def race(backend):
+            cancel = cancels[backend.name]
+            work_dir = output_path.parent / f"hedge_{backend.name}"
+            work_dir.mkdir(exist_ok=True)
+            try:
+                results.put((backend, self.run(backend, url, work_dir / output_path.name, cancel, progress), None))
+            except Exception as e:
+                results.put((backend, None, e))
+            finally:
+                if cancel.is_set():
+                    shutil.rmtree(work_dir, ignore_errors=True)
+        
+        def start(backend):
+            cancels[backend.name] = threading.Event()
+            print(f"🔄 Trying {backend.name}...")
+            threading.Thread(target=race, args=(backend,), name=f"hedge-{backend.name}", daemon=True).start()
+        
+        start(primary)
+        running = 1
+        hedged = False
+        errors = []
+        try:
+            while running:
+                try:
+                    backend, downloaded_file, error = results.get(timeout=None if hedged else hedge_after)
+                except queue.Empty:
+                    print(f"⏱️ {primary.name} slower than {hedge_after:.1f}s, hedging with {secondary.name}...")
+                    start(secondary)
+                    running += 1
+                    hedged = True
+                    continue
+                
+                running -= 1
+                if error is None:
+                    final_output_path = output_path.with_suffix(downloaded_file.suffix)
+                    shutil.move(str(downloaded_file), str(final_output_path))
+                    shutil.rmtree(downloaded_file.parent, ignore_errors=True)
+                    return final_output_path
+                
+                errors.append(f"{backend.name}: {error}")
+                if not hedged:
+                    # Primary failed outright - go straight to the secondary
+                    start(secondary)
+                    running += 1
+                    hedged = True
+        finally:
+            for cancel in cancels.values():
+                cancel.set()
+        
+        raise Exception(f"All services failed. {'; '.join(errors)}")
+    
+    def stats(self):
+        return {backend.name: backend.stats() for backend in self._backends}
+
+DOWNLOAD_BACKENDS = BackendRegistry()
+DOWNLOAD_BACKENDS.register(DownloadBackend(
+    'local', download_youtube_audio_local,
+    available=lambda url: find_local_audio(url) is not None, expected_latency=0.0))
+DOWNLOAD_BACKENDS.register(DownloadBackend(
+    'cnvmp3', download_youtube_audio_cnvmp3, attempts=2, available=lambda url: HAS_SELENIUM))
+DOWNLOAD_BACKENDS.register(DownloadBackend(
+    'ytmp3', download_youtube_audio_ytmp3, available=lambda url: HAS_SELENIUM))
+DOWNLOAD_BACKENDS.register(DownloadBackend(
+    'yt-dlp', download_youtube_audio_ytdlp, available=lambda url: _has_yt_dlp()))
+
+def get_download_backend_stats():
+    """Circuit state and rolling stats for every download backend"""
+    return DOWNLOAD_BACKENDS.stats()
+
+def download_youtube_audio(url, output_path, hedge=None, hedge_after=HEDGE_AFTER, progress=None):
+    """Main download function - tries the registered backends, healthiest first
+    
+    With hedge=True a second backend is raced against the first one if it is
+    slow (see BackendRegistry.download_hedged).
+    """
+    print(f"🎵 Downloading: {url}")
+    if hedge is None:
+        hedge = HEDGE_DOWNLOADS
+    if hedge:
+        return DOWNLOAD_BACKENDS.download_hedged(url, output_path, hedge_after, progress)
+    return DOWNLOAD_BACKENDS.download(url, output_path, progress)
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single execution"""
+    
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+    
+    def do(self, key, func):
+        """Run func() unless a call for key is already running, in which case wait for its result
+        
+        Returns (result, shared) where shared is True if another caller did the work.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = func()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+class TrackCache:
+    """Size-bounded LRU cache of downloaded tracks, stored as <key>.<ext>
+    
+    Keys are a video ID for full tracks or section_cache_key() for ranged downloads.
+    """
+    
+    def __init__(self, root=TRACK_CACHE_DIR, max_bytes=TRACK_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'inserts': 0, 'evictions': 0, 'evicted_bytes': 0}
+    
+    def _entries(self):
+        return [p for p in self.root.iterdir() if p.is_file() and not p.name.startswith('.')]
+    
+    def _find(self, key):
+        for path in self.root.glob(f"{key}.*"):
+            if path.is_file():
+                return path
+        return None
+    
+    def get(self, key, record=True, link_to=None):
+        """Return the cached file for key (marking it recently used) or None
+        
+        record=False skips the hit/miss counters, for re-checks after waiting on a lock.
+        With link_to, the file is hard-linked (or copied) to link_to plus its
+        suffix and that path is returned instead: a working copy owned by the
+        caller, which eviction can't remove while it is being read.
+        """
+        with self._lock:
+            path = self._find(key)
+            if path is None:
+                if record:
+                    self._counters['misses'] += 1
+                return None
+            if record:
+                self._counters['hits'] += 1
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            if link_to is None:
+                return path
+            
+            link = Path(link_to).with_suffix(path.suffix)
+            link.unlink(missing_ok=True)
+            try:
+                os.link(path, link)
+            except OSError:
+                # Different filesystem (or no hard links) - fall back to a copy
+                shutil.copy2(path, link)
+            return link
+    
+    def put(self, key, source_file):
+        """Move source_file into the cache atomically and return its cached path"""
+        source_file = Path(source_file)
+        final_path = self.root / f"{key}{source_file.suffix.lower()}"
+        tmp_path = self.root / f".{key}.{uuid.uuid4().hex}.tmp"
+        shutil.move(str(source_file), str(tmp_path))
+        
+        with self._lock:
+            for old in self.root.glob(f"{key}.*"):
+                if old != final_path:
+                    old.unlink(missing_ok=True)
+            os.replace(tmp_path, final_path)
+            os.utime(final_path)
+            self._counters['inserts'] += 1
+            self._evict(keep=final_path)
+        return final_path
+    
+    def _evict(self, keep=None):
+        entries = []
+        for path in self._entries():
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            self._counters['evictions'] += 1
+            self._counters['evicted_bytes'] += size
+    
+    def stats(self):
+        """Cache size and hit/miss counters"""
+        with self._lock:
+            stats = dict(self._counters)
+            entries = self._entries()
+        stats['entries'] = len(entries)
+        stats['bytes'] = sum(p.stat().st_size for p in entries if p.exists())
+        stats['max_bytes'] = self.max_bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+TRACK_CACHE = TrackCache()
+DOWNLOAD_FLIGHTS = SingleFlight()
+
+def get_track_cache_stats():
+    """Return the shared track cache's stats"""
+    stats = TRACK_CACHE.stats()
+    stats['shared_downloads'] = DOWNLOAD_FLIGHTS.coalesced
+    return stats
+
+def get_section_window(start_time, end_time):
+    """The padded (start, end) window a ranged download fetches for a segment"""
+    return max(0, start_time - SECTION_PREROLL), end_time + SECTION_POSTROLL
+
+def section_cache_key(video_id, window):
+    """Track cache key for a ranged download of window=(start, end) seconds"""
+    return f"{video_id}@{int(window[0] * 1000)}-{int(window[1] * 1000)}"
+
+@contextmanager
+def download_lock(key):
+    """Cross-process lock around downloading key, via flock on a file in the cache dir
+    
+    A no-op where fcntl isn't available (Windows) or CROSS_PROCESS_DOWNLOAD_LOCKS is off.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if fcntl is None or not CROSS_PROCESS_DOWNLOAD_LOCKS:
+        yield
+        return
+    
+    with open(TRACK_CACHE.root / f".{key}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def fetch_shared(key, download, output_path, progress=None):
+    """Cache key's file, running download() at most once across concurrent callers
+    
+    Callers in this process share one in-flight download; other worker
+    processes wait on the lock file and then find the result in the cache.
+    Returns a working copy linked next to output_path (see TrackCache.get).
+    """
+    def load():
+        with download_lock(key):
+            cached_file = TRACK_CACHE.get(key, record=False)
+            if cached_file:
+                return cached_file
+            return TRACK_CACHE.put(key, download())
+    
+    while True:
+        _, shared = DOWNLOAD_FLIGHTS.do(key, load)
+        if shared:
+            print(f"🤝 Joined in-flight download: {key}")
+            report_progress(progress, 'downloading', provider='shared')
+        working_file = TRACK_CACHE.get(key, record=False, link_to=output_path)
+        if working_file:
+            return working_file
+        # Evicted by another insert before we could link it - fetch it again
+        print(f"⚠️ {key} was evicted before use, fetching it again")
+
+def fetch_youtube_audio(url, output_path, section=None, progress=None):
+    """Return (audio_file, offset) for url, only downloading on a cache miss
+    
+    offset is the source time at which audio_file starts: 0 for a full track,
+    or the start of the padded window when section=(start, end) was served by a
+    ranged yt-dlp download. Concurrent requests for the same track (or the same
+    window) share a single download. audio_file is a hard link to the cached
+    track next to output_path, so it survives cache eviction and belongs to
+    the caller. progress gets a 'downloading' update naming the provider
+    that is tried (or 'cache'/'shared').
+    """
+    video_id = extract_video_id(url)
+    if not video_id:
+        return download_youtube_audio(url, output_path, progress=progress), 0
+    
+    cached_file = TRACK_CACHE.get(video_id, link_to=output_path)
+    if cached_file:
+        print(f"💾 Cache hit: {video_id}")
+        report_progress(progress, 'downloading', provider='cache')
+        return cached_file, 0
+    
+    ytdlp = DOWNLOAD_BACKENDS.get('yt-dlp')
+    if section is not None and RANGE_DOWNLOADS and ytdlp is not None and ytdlp.available(url):
+        window = get_section_window(*section)
+        key = section_cache_key(video_id, window)
+        try:
+            cached_file = TRACK_CACHE.get(key, link_to=output_path)
+            if cached_file:
+                print(f"💾 Cache hit: {key}")
+                report_progress(progress, 'downloading', provider='cache')
+                return cached_file, window[0]
+            if ytdlp.breaker.state == 'open':
+                raise Exception("yt-dlp circuit open")
+            print(f"✂️ Downloading {window[0]:.1f}s-{window[1]:.1f}s of {url}")
+            return fetch_shared(
+                key, lambda: DOWNLOAD_BACKENDS.run(ytdlp, url, output_path, progress=progress, section=window),
+                output_path, progress
+            ), window[0]
+        except Exception as e:
+            print(f"⚠️ Ranged download failed, fetching the full track: {e}")
+    
+    return fetch_shared(
+        video_id, lambda: download_youtube_audio(url, output_path, progress=progress), output_path, progress
+    ), 0
+
+class ProcessCancelled(Exception):
+    """Raised when a managed ffmpeg process is killed because its cancel event was set"""
+
+class FFmpegRun:
+    """Outcome of one run_ffmpeg call"""
+    
+    def __init__(self, cmd, returncode, stdout, stderr, wall, cpu, max_rss):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr  # only the last FFMPEG_STDERR_LINES lines, each cut to FFMPEG_STDERR_LINE_BYTES
+        self.wall = wall
+        self.cpu = cpu
+        self.max_rss = max_rss  # peak VmHWM in bytes, None where /proc isn't available
+
+class ProcessStats:
+    """Per-name call counts, failures and resource usage of managed processes"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+    
+    def record(self, name, run=None, outcome='ok'):
+        with self._lock:
+            entry = self._stats.setdefault(name, {
+                'calls': 0, 'failed': 0, 'timeouts': 0, 'cancelled': 0,
+                'wall': 0.0, 'cpu': 0.0, 'max_rss': 0,
+            })
+            entry['calls'] += 1
+            if outcome == 'timeout':
+                entry['timeouts'] += 1
+            elif outcome == 'cancelled':
+                entry['cancelled'] += 1
+            elif run is not None and run.returncode != 0:
+                entry['failed'] += 1
+            if run is not None:
+                entry['wall'] += run.wall
+                entry['cpu'] += run.cpu
+                entry['max_rss'] = max(entry['max_rss'], run.max_rss or 0)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                name: {
+                    'calls': entry['calls'],
+                    'failed': entry['failed'],
+                    'timeouts': entry['timeouts'],
+                    'cancelled': entry['cancelled'],
+                    'avg_wall_ms': round(entry['wall'] / entry['calls'] * 1000, 1),
+                    'avg_cpu_ms': round(entry['cpu'] / entry['calls'] * 1000, 1),
+                    'peak_rss_mb': round(entry['max_rss'] / 1024 / 1024, 1),
+                }
+                for name, entry in self._stats.items()
+            }
+
+FFMPEG_STATS = ProcessStats()
+
+class FFmpegGovernor:
+    """Admits ffmpeg processes into a fixed number of slots, first come first served
+    
+    Slots are shared with other worker processes through flock'd lock files;
+    where fcntl isn't available they only bound this process.
+    """
+    
+    def __init__(self, slots=FFMPEG_SLOTS, threads=FFMPEG_THREADS, slot_dir=FFMPEG_SLOT_DIR):
+        cores = os.cpu_count() or 1
+        self.slots = max(1, slots or cores // 2)
+        self.threads = max(1, threads or cores // self.slots)
+        self.slot_dir = Path(slot_dir)
+        self._changed = threading.Condition()
+        self._waiting = deque()
+        self._active = 0
+        self._counters = {'admitted': 0, 'cancelled': 0, 'wait': 0.0, 'max_wait': 0.0}
+    
+    def _try_lock_file(self):
+        """Lock a free slot file, returning its open handle (or True without fcntl), else None"""
+        try:
+            import fcntl
+        except ImportError:
+            return True
+        
+        self.slot_dir.mkdir(parents=True, exist_ok=True)
+        for n in range(self.slots):
+            handle = open(self.slot_dir / f"slot-{n}.lock", 'a')
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except OSError:
+                handle.close()
+        return None
+    
+    @contextmanager
+    def slot(self, cancel=None):
+        """Wait (in arrival order) for a free slot and hold it for the duration of the block"""
+        ticket = object()
+        waited = time.monotonic()
+        with self._changed:
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        self._counters['cancelled'] += 1
+                        raise ProcessCancelled("Cancelled while waiting for an ffmpeg slot")
+                    if self._waiting[0] is ticket and self._active < self.slots:
+                        handle = self._try_lock_file()
+                        if handle is not None:
+                            break
+                    # Other workers release their slots without notifying us, so re-check now and then
+                    self._changed.wait(0.1)
+            finally:
+                self._waiting.remove(ticket)
+                self._changed.notify_all()
+            
+            self._active += 1
+            wait = time.monotonic() - waited
+            self._counters['admitted'] += 1
+            self._counters['wait'] += wait
+            self._counters['max_wait'] = max(self._counters['max_wait'], wait)
+        
+        try:
+            yield
+        finally:
+            if handle is not True:
+                handle.close()  # closing the file drops its flock
+            with self._changed:
+                self._active -= 1
+                self._changed.notify_all()
+    
+    def stats(self):
+        with self._changed:
+            admitted = self._counters['admitted']
+            return {
+                'slots': self.slots,
+                'threads': self.threads,
+                'active': self._active,
+                'queued': len(self._waiting),
+                'admitted': admitted,
+                'cancelled': self._counters['cancelled'],
+                'avg_wait_ms': round(self._counters['wait'] / admitted * 1000, 1) if admitted else 0.0,
+                'max_wait_ms': round(self._counters['max_wait'] * 1000, 1),
+            }
+
+FFMPEG_GOVERNOR = FFmpegGovernor()
+
+def _drain(stream, sink, limit=None):
+    """Feed every line of stream to sink (cut to limit bytes), then close it"""
+    with stream:
+        cut = False
+        while True:
+            line = stream.readline(limit or -1)
+            if not line:
+                break
+            if not cut:
+                sink(line if line.endswith(b'\n') else line + b'\n')
+            cut = not line.endswith(b'\n')
+
+def _parse_progress(stream, on_progress):
+    """Turn ffmpeg -progress key=value blocks into on_progress(dict) calls"""
+    block = {}
+    
+    def collect(line):
+        key, _, value = line.decode(errors='replace').strip().partition('=')
+        if not key:
+            return
+        block[key] = value
+        if key == 'progress':
+            update = dict(block)
+            # out_time_ms is in microseconds too, for historical reasons
+            micros = update.get('out_time_us') or update.get('out_time_ms')
+            if micros and micros.isdigit():
+                update['seconds'] = int(micros) / 1e6
+            block.clear()
+            on_progress(update)
+    
+    _drain(stream, collect)
+
+def _kill_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        process.kill()
+
+def _peak_rss(process):
+    """VmHWM of a running process in bytes, or None if it can't be read
+    
+    wait4's ru_maxrss would also count the memory of the Python process that
+    forked it, so the high-water mark is read from /proc instead. Samples taken
+    before exec (while the child is still a copy of this process) are skipped.
+    """
+    try:
+        with open(f'/proc/{process.pid}/status') as status:
+            fields = dict(line.split(':', 1) for line in status if ':' in line)
+    except OSError:
+        return None
+    if fields.get('Name', '').strip() != os.path.basename(process.args[0])[:15]:
+        return None
+    hwm = fields.get('VmHWM', '').split()
+    return int(hwm[0]) * 1024 if hwm and hwm[0].isdigit() else None
+
+def _reap(process, deadline, cancel):
+    """Wait for process, killing its group on deadline/cancel; returns (rusage, outcome, peak_rss)"""
+    outcome = 'ok'
+    peak_rss = None
+    while True:
+        peak_rss = max(filter(None, (peak_rss, _peak_rss(process))), default=None)
+        if hasattr(os, 'wait4'):
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                process.returncode = os.waitstatus_to_exitcode(status)
+                return rusage, outcome, peak_rss
+        elif process.poll() is not None:
+            return None, outcome, peak_rss
+        
+        if outcome == 'ok':
+            if cancel is not None and cancel.is_set():
+                outcome = 'cancelled'
+            elif time.monotonic() > deadline:
+                outcome = 'timeout'
+            if outcome != 'ok':
+                _kill_group(process)
+        
+        if cancel is not None:
+            cancel.wait(0.05)
+        else:
+            time.sleep(0.05)
+
+def run_ffmpeg(cmd, name, timeout=FFMPEG_TIMEOUT, input=None, on_progress=None, cancel=None, text=True):
+    """Run an ffmpeg/ffprobe command under a deadline, returning an FFmpegRun
+    
+    The process gets its own process group, which is killed if it runs past
+    timeout seconds (raising an Exception) or cancel is set (raising
+    ProcessCancelled). stderr is kept as a ring buffer of its last lines.
+    With on_progress, ffmpeg's -progress output is parsed on a separate pipe
+    and each block is passed on as a dict (with 'seconds' of output written).
+    Wall time, CPU time and peak RSS are recorded in FFMPEG_STATS under name.
+    
+    ffmpeg (but not ffprobe) first waits for a FFMPEG_GOVERNOR slot and is
+    limited to its thread count; the timeout starts once it is admitted.
+    """
+    if cmd[0] != 'ffmpeg':
+        return _run_managed(cmd, name, timeout, input, on_progress, cancel, text)
+    
+    with FFMPEG_GOVERNOR.slot(cancel):
+        # -threads is an output option, so it goes just before the output file
+        cmd = cmd[:-1] + ['-threads', str(FFMPEG_GOVERNOR.threads), cmd[-1]]
+        return _run_managed(cmd, name, timeout, input, on_progress, cancel, text)
+
+def _run_managed(cmd, name, timeout, input, on_progress, cancel, text):
+    progress_read = progress_write = None
+    pass_fds = ()
+    if cmd[0] == 'ffmpeg':
+        # The stats line is redrawn with \r, which would make stderr one ever-growing line
+        cmd = [cmd[0], '-nostats'] + cmd[1:]
+    if on_progress is not None:
+        progress_read, progress_write = os.pipe()
+        pass_fds = (progress_write,)
+        cmd = [cmd[0], '-progress', f'pipe:{progress_write}'] + cmd[1:]
+    
+    started = time.monotonic()
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            pass_fds=pass_fds,
+            start_new_session=True
+        )
+    finally:
+        if progress_write is not None:
+            os.close(progress_write)
+    
+    stdout_chunks = []
+    stderr_tail = deque(maxlen=FFMPEG_STDERR_LINES)
+    readers = [
+        threading.Thread(target=lambda: stdout_chunks.append(process.stdout.read()), daemon=True),
+        threading.Thread(
+            target=_drain, args=(process.stderr, stderr_tail.append, FFMPEG_STDERR_LINE_BYTES), daemon=True
+        ),
+    ]
+    if progress_read is not None:
+        readers.append(threading.Thread(
+            target=_parse_progress, args=(os.fdopen(progress_read, 'rb'), on_progress), daemon=True
+        ))
+    if input is not None:
+        def feed():
+            try:
+                process.stdin.write(input)
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+        readers.append(threading.Thread(target=feed, daemon=True))
+    for reader in readers:
+        reader.start()
+    
+    rusage, outcome, peak_rss = _reap(process, started + timeout, cancel)
+    for reader in readers:
+        reader.join()
+    process.stdout.close()
+    
+    stdout = b''.join(stdout_chunks)
+    run = FFmpegRun(
+        cmd,
+        process.returncode,
+        stdout.decode(errors='replace') if text else stdout,
+        b''.join(stderr_tail).decode(errors='replace'),
+        time.monotonic() - started,
+        rusage.ru_utime + rusage.ru_stime if rusage else 0.0,
+        peak_rss
+    )
+    FFMPEG_STATS.record(name, run, outcome)
+    
+    if outcome == 'timeout':
+        raise Exception(f"{cmd[0]} {name} timed out after {timeout}s: {run.stderr}")
+    if outcome == 'cancelled':
+        raise ProcessCancelled(f"{cmd[0]} {name} cancelled")
+    return run
+
+def encoding_progress(duration, progress):
+    """on_progress callback for run_ffmpeg that reports 'encoding' percent of duration seconds"""
+    if progress is None or not duration:
+        return None
+    
+    last = [-1]
+    def on_progress(update):
+        if 'seconds' not in update:
+            return
+        percent = min(100, int(update['seconds'] / duration * 100))
+        if percent > last[0]:
+            last[0] = percent
+            progress('encoding', percent=percent)
+    return on_progress
+
+@contextmanager
+def ffmpeg_process(cmd, name, timeout=FFMPEG_TIMEOUT, cancel=None, stdin=False, stdout=False):
+    """Start an ffmpeg process whose stdin and/or stdout the caller streams through
+    
+    Yields the Popen. Like run_ffmpeg it runs in its own process group with a
+    bounded stderr buffer, is killed once timeout passes or cancel is set, and
+    is recorded in FFMPEG_STATS. Leaving the block closes stdin, waits for the
+    process and raises if it failed; an exception inside the block kills it.
+    It doesn't take a governor slot, so callers running several connected
+    processes hold one slot for the whole group.
+    """
+    cmd = [cmd[0], '-nostats'] + cmd[1:]
+    started = time.monotonic()
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if stdin else subprocess.DEVNULL,
+        stdout=subprocess.PIPE if stdout else subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        start_new_session=True
+    )
+    stderr_tail = deque(maxlen=FFMPEG_STDERR_LINES)
+    reader = threading.Thread(
+        target=_drain, args=(process.stderr, stderr_tail.append, FFMPEG_STDERR_LINE_BYTES), daemon=True
+    )
+    reader.start()
+    
+    # The caller is blocked on the pipes, so deadlines are enforced from a watchdog
+    finished = threading.Event()
+    outcome = ['ok']
+    peak_rss = [None]
+    def watchdog():
+        while not finished.wait(0.1):
+            peak_rss[0] = max(filter(None, (peak_rss[0], _peak_rss(process))), default=None)
+            if cancel is not None and cancel.is_set():
+                outcome[0] = 'cancelled'
+            elif time.monotonic() > started + timeout:
+                outcome[0] = 'timeout'
+            else:
+                continue
+            _kill_group(process)
+            return
+    threading.Thread(target=watchdog, daemon=True).start()
+    
+    try:
+        yield process
+    except BaseException:
+        _kill_group(process)
+        raise
+    finally:
+        if process.stdin:
+            try:
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+        rusage, _, last_peak_rss = _reap(process, float('inf'), None)
+        finished.set()
+        reader.join()
+        if process.stdout:
+            process.stdout.close()
+        
+        run = FFmpegRun(
+            cmd,
+            process.returncode,
+            None,
+            b''.join(stderr_tail).decode(errors='replace'),
+            time.monotonic() - started,
+            rusage.ru_utime + rusage.ru_stime if rusage else 0.0,
+            max(filter(None, (peak_rss[0], last_peak_rss)), default=None)
+        )
+        FFMPEG_STATS.record(name, run, outcome[0])
+    
+    if outcome[0] == 'timeout':
+        raise Exception(f"{cmd[0]} {name} timed out after {timeout}s: {run.stderr}")
+    if outcome[0] == 'cancelled':
+        raise ProcessCancelled(f"{cmd[0]} {name} cancelled")
+    if run.returncode != 0:
+        raise Exception(f"FFMPEG {name} failed: {run.stderr}")
+
+def get_ffmpeg_stats():
+    """Return ffmpeg slot usage plus per-call-site counts, timeouts and resource usage"""
+    return {
+        'governor': FFMPEG_GOVERNOR.stats(),
+        'calls': FFMPEG_STATS.stats(),
+    }
+
+def codec_args(output_file):
+    """Encoder arguments for output_file chosen by its suffix (MP3 if unknown), at 44.1 kHz stereo"""
+    return OUTPUT_CODECS.get(Path(output_file).suffix.lower(), OUTPUT_CODECS['.mp3']) + ['-ar', '44100', '-ac', '2']
+
+def intermediate_file(directory, stem):
+    """Path for an intermediate artifact in INTERMEDIATE_FORMAT"""
+    return Path(directory) / f"{stem}.{INTERMEDIATE_FORMAT}"
+
+def probe_audio_stream(audio_file):
+    """Return codec_name, bit_rate, sample_rate and channels of the first audio stream, or None"""
+    cmd = [
+        'ffprobe', '-v', 'quiet', '-select_streams', 'a:0',
+        '-show_entries', 'stream=codec_name,bit_rate,sample_rate,channels',
+        '-of', 'json', str(audio_file)
+    ]
+    
+    try:
+        result = run_ffmpeg(cmd, 'probe', timeout=FFPROBE_TIMEOUT)
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        return None
+    
+    try:
+        streams = json.loads(result.stdout).get('streams', [])
+    except ValueError:
+        return None
+    if not streams:
+        return None
+    
+    stream = streams[0]
+    return {
+        'codec_name': stream.get('codec_name'),
+        'bit_rate': int(stream.get('bit_rate') or 0),
+        'sample_rate': int(stream.get('sample_rate') or 0),
+        'channels': int(stream.get('channels') or 0),
+    }
+
+def can_stream_copy(audio_file):
+    """Whether audio_file is already MP3 in a format we can cut without re-encoding"""
+    stream = probe_audio_stream(audio_file)
+    return (
+        stream is not None and
+        stream['codec_name'] == 'mp3' and
+        stream['bit_rate'] >= STREAM_COPY_MIN_BITRATE and
+        stream['sample_rate'] == 44100 and
+        stream['channels'] == 2
+    )
+
+def _run_extract(cmd, output_file):
+    result = run_ffmpeg(cmd, 'extract')
+    if result.returncode != 0:
+        raise Exception(f"FFMPEG segment extraction failed: {result.stderr}")
+    
+    if not output_file.exists() or output_file.stat().st_size == 0:
+        raise Exception(f"Output file creation failed: {output_file}")
+    
+    return output_file
+
+def extract_segment(input_file, output_file, start_time, duration, mode=EXTRACT_MODE):
+    """Extract a specific time segment from an audio file using FFMPEG
+    
+    'fast' mode seeks on the input side so ffmpeg skips straight to start_time
+    instead of decoding everything before it, and stream-copies sources that are
+    already suitable MP3. If that fails it falls back to 'accurate' mode, which
+    decodes from the beginning of the file (the original behaviour).
+    The output is encoded according to output_file's suffix (see codec_args).
+    """
+    if not input_file.exists():
+        raise Exception(f"Input file does not exist: {input_file}")
+    
+    if input_file.stat().st_size == 0:
+        raise Exception(f"Input file is empty: {input_file}")
+    
+    encode_args = codec_args(output_file)
+    
+    if mode == 'fast':
+        seek_args = ['-ss', str(start_time), '-t', str(duration), '-i', str(input_file)]
+        if output_file.suffix.lower() == '.mp3' and can_stream_copy(input_file):
+            try:
+                return _run_extract(['ffmpeg'] + seek_args + ['-c:a', 'copy', '-y', str(output_file)], output_file)
+            except Exception as e:
+                print(f"⚠️ Stream copy failed, re-encoding instead: {e}")
+        try:
+            return _run_extract(['ffmpeg'] + seek_args + encode_args + ['-y', str(output_file)], output_file)
+        except Exception as e:
+            print(f"⚠️ Fast seek failed, retrying with accurate seek: {e}")
+    
+    cmd = [
+        'ffmpeg', '-i', str(input_file),
+        '-ss', str(start_time),
+        '-t', str(duration),
+    ] + encode_args + [
+        '-y',
+        str(output_file)
+    ]
+    return _run_extract(cmd, output_file)
+
+def apply_fades(input_file, output_file, fade_in, fade_out, total_duration):
+    """Apply fade in and fade out effects to an audio file"""
+    fade_out_start = max(0, total_duration - fade_out)
+    
+    filters = []
+    if fade_in > 0:
+        filters.append(f"afade=t=in:d={fade_in}")
+    if fade_out > 0:
+        filters.append(f"afade=t=out:st={fade_out_start}:d={fade_out}")
+    
+    cmd = ['ffmpeg', '-i', str(input_file)]
+    
+    if filters:
+        cmd.extend(['-af', ','.join(filters)])
+    
+    cmd.extend(codec_args(output_file) + [
+        '-y',
+        str(output_file)
+    ])
+    
+    result = run_ffmpeg(cmd, 'fade')
+    if result.returncode != 0:
+        raise Exception(f"FFMPEG fade failed: {result.stderr}")
+    
+    return output_file
+
+def get_audio_duration(audio_file):
+    """Get the duration of an audio file in seconds"""
+    cmd = [
+        'ffprobe', '-v', 'quiet', '-show_entries', 'format=duration',
+        '-of', 'csv=p=0', str(audio_file)
+    ]
+    
+    result = run_ffmpeg(cmd, 'duration', timeout=FFPROBE_TIMEOUT)
+    if result.returncode != 0:
+        raise Exception(f"Failed to get audio duration: {result.stderr}")
+    
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        raise Exception(f"Invalid duration format: {result.stdout.strip()}")
+
+def concatenate_audio(input_files, output_file):
+    """Concatenate multiple audio files into one using FFMPEG with proper re-encoding"""
+    concat_file = output_file.parent / f"concat_{uuid.uuid4().hex}.txt"
+    
+    with open(concat_file, 'w') as f:
+        for file_path in input_files:
+            f.write(f"file '{file_path.absolute()}'\n")
+    
+    cmd = [
+        'ffmpeg', '-f', 'concat', '-safe', '0',
         '-i', str(concat_file),
         '-acodec', 'libmp3lame',  # Force MP3 encoding
         '-b:a', '192k',           # Set bitrate
@@ -362,24 +2059,296 @@ def concatenate_audio(input_files, output_file):
         str(output_file)
     ]
     
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    concat_file.unlink()
+    try:
+        result = run_ffmpeg(cmd, 'concat')
+    finally:
+        concat_file.unlink()
     
     if result.returncode != 0:
         raise Exception(f"FFMPEG concat failed: {result.stderr}")
     
     return output_file
 
-def create_overlapping_mixtape(segment_files, fade_durations, output_file, overlap_duration=3.0):
-    """Create a mixtape with crossfades between segments"""
+def group_songs(songs, merge_gap=SECTION_MERGE_GAP):
+    """Group playlist indexes by source video, in order of first appearance
+    
+    Songs whose URL has no recognisable video ID are keyed by the URL itself.
+    With ranged downloads a video's songs are further split wherever their
+    windows are more than merge_gap seconds apart, so each group's download
+    only spans windows that are close together.
+    """
+    groups = OrderedDict()
+    for i, song in enumerate(songs):
+        key = extract_video_id(song['youtubeUrl']) or song['youtubeUrl']
+        groups.setdefault(key, []).append(i)
+    if not RANGE_DOWNLOADS:
+        return list(groups.values())
+    
+    clusters = []
+    for key, indexes in groups.items():
+        if not extract_video_id(songs[indexes[0]]['youtubeUrl']):
+            clusters.append(indexes)
+            continue
+        current, current_end = [], None
+        for i in sorted(indexes, key=lambda i: songs[i]['startTime']):
+            if current and max(0, songs[i]['startTime']) - current_end > merge_gap:
+                clusters.append(sorted(current))
+                current = []
+            if not current:
+                current_end = songs[i]['endTime']
+            current.append(i)
+            current_end = max(current_end, songs[i]['endTime'])
+        clusters.append(sorted(current))
+    return sorted(clusters, key=lambda indexes: indexes[0])
+
+def prepare_group_source(songs, indexes, session_dir, progress=None):
+    """Fetch the source audio shared by songs (all from one video) into one directory
+    
+    The download covers the union of the songs' windows (group_songs keeps
+    those close together). Returns
+    (source_file, local_songs) where each song's start/end times are shifted to
+    be relative to source_file, which may only hold that window.
+    """
+    song_dir = session_dir / f"song_{indexes[0]}"
+    song_dir.mkdir(exist_ok=True)
+    
+    download_path = song_dir / f"download_{indexes[0]}"
+    section = (min(max(0, song['startTime']) for song in songs), max(song['endTime'] for song in songs))
+    song_progress = None
+    if progress is not None:
+        song_progress = lambda stage, **details: progress(stage, song=indexes[0] + 1, **details)
+    downloaded_file, offset = fetch_youtube_audio(songs[0]['youtubeUrl'], download_path, section, song_progress)
+    
+    if not downloaded_file.exists() or downloaded_file.stat().st_size == 0:
+        raise Exception(f"Download failed for song {indexes[0]+1}")
+    
+    local_songs = [
+        dict(song, startTime=max(0, song['startTime']) - offset, endTime=song['endTime'] - offset)
+        for song in songs
+    ]
+    return downloaded_file, local_songs
+
+def extract_song_segment(source_file, song, index, session_dir, progress=None):
+    """Extract the song's selected time window from its source file"""
+    report_progress(progress, 'extracting', song=index + 1)
+    start_time = max(0, song['startTime'])
+    segment_duration = song['endTime'] - start_time
+    
+    segment_file = intermediate_file(session_dir, f"segment_{index}")
+    extract_segment(source_file, segment_file, start_time, segment_duration)
+    
+    if not segment_file.exists():
+        raise Exception(f"Segment extraction failed for song {index+1}")
+    
+    return segment_file
+
+class PipelineStats:
+    """Per-stage totals across pipeline runs"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._runs = 0
+    
+    def record(self, metrics):
+        with self._lock:
+            self._runs += 1
+            for name, stage in metrics.items():
+                entry = self._stages.setdefault(name, {
+                    'items': 0, 'capacity': 0.0, 'busy': 0.0, 'starved': 0.0, 'blocked': 0.0,
+                })
+                for field in entry:
+                    entry[field] += stage[field]
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'runs': self._runs,
+                'stages': {
+                    name: {
+                        'items': entry['items'],
+                        'busy_seconds': round(entry['busy'], 2),
+                        'starved_seconds': round(entry['starved'], 2),
+                        'blocked_seconds': round(entry['blocked'], 2),
+                        'utilization': round(entry['busy'] / entry['capacity'], 3) if entry['capacity'] else None,
+                    }
+                    for name, entry in self._stages.items()
+                },
+            }
+
+PIPELINE_STATS = PipelineStats()
+
+class StagePipeline:
+    """Run items through stages of worker threads joined by bounded queues
+    
+    stages is a list of (name, func, workers); each func takes the previous
+    stage's output. Per stage it measures time spent working (busy), waiting
+    for input (starved) and waiting for room downstream (blocked).
+    """
+    
+    _DONE = object()
+    
+    def __init__(self, stages, queue_size=PIPELINE_QUEUE_SIZE, stats=PIPELINE_STATS):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = stats
+        self.metrics = {}
+    
+    def run(self, items):
+        """Return the last stage's outputs in input order, raising the first stage error"""
+        items = list(items)
+        queues = [queue.Queue()] + [queue.Queue(maxsize=self.queue_size) for _ in self.stages[1:]]
+        results = [None] * len(items)
+        errors = []
+        lock = threading.Lock()
+        remaining = [workers for _, _, workers in self.stages]
+        self.metrics = {
+            name: {'items': 0, 'capacity': 0.0, 'busy': 0.0, 'starved': 0.0, 'blocked': 0.0}
+            for name, _, _ in self.stages
+        }
+        
+        for position, item in enumerate(items):
+            queues[0].put((position, item))
+        for _ in range(self.stages[0][2]):
+            queues[0].put(self._DONE)
+        
+        def worker(stage):
+            name, func, _ = self.stages[stage]
+            last = stage == len(self.stages) - 1
+            busy = starved = blocked = 0.0
+            count = 0
+            while True:
+                waited = time.monotonic()
+                entry = queues[stage].get()
+                starved += time.monotonic() - waited
+                if entry is self._DONE:
+                    break
+                position, item = entry
+                # After a failure keep draining so upstream puts never block forever
+                if errors:
+                    continue
+                started = time.monotonic()
+                try:
+                    output = func(item)
+                except Exception as e:
+                    with lock:
+                        errors.append(e)
+                    continue
+                finally:
+                    busy += time.monotonic() - started
+                count += 1
+                if last:
+                    results[position] = output
+                else:
+                    waited = time.monotonic()
+                    queues[stage + 1].put((position, output))
+                    blocked += time.monotonic() - waited
+            
+            with lock:
+                metrics = self.metrics[name]
+                metrics['items'] += count
+                metrics['busy'] += busy
+                metrics['starved'] += starved
+                metrics['blocked'] += blocked
+                remaining[stage] -= 1
+                finished = remaining[stage] == 0
+            if finished and not last:
+                for _ in range(self.stages[stage + 1][2]):
+                    queues[stage + 1].put(self._DONE)
+        
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=worker, args=(stage,), daemon=True)
+            for stage, (_, _, workers) in enumerate(self.stages)
+            for _ in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.monotonic() - started
+        
+        for name, _, workers in self.stages:
+            self.metrics[name]['capacity'] = wall * workers
+        if self.stats is not None:
+            self.stats.record(self.metrics)
+        
+        if errors:
+            raise errors[0]
+        return results
+
+def get_pipeline_stats():
+    """Return per-stage utilization of the download/extract pipeline"""
+    return PIPELINE_STATS.stats()
+
+def download_sources(songs, session_dir, later_stages=(), max_workers=MAX_PARALLEL_DOWNLOADS, progress=None):
+    """Fetch each distinct source video once, then pass it through later_stages
+    
+    Runs a StagePipeline whose 'download' stage turns a group of song indexes
+    (see group_songs) into (source_file, local_songs, indexes) for the next
+    stage. Returns (groups, outputs) with the last stage's output per group.
+    """
+    groups = group_songs(songs)
+    if len(groups) < len(songs):
+        print(f"🔁 {len(songs)} songs share {len(groups)} sources")
+    
+    def download(indexes):
+        source_file, local_songs = prepare_group_source([songs[i] for i in indexes], indexes, session_dir, progress)
+        return source_file, local_songs, indexes
+    
+    pipeline = StagePipeline([('download', download, max(1, min(max_workers, len(groups))))] + list(later_stages))
+    return groups, pipeline.run(groups)
+
+def prepare_segments(songs, session_dir, max_workers=MAX_PARALLEL_DOWNLOADS, progress=None):
+    """Download each source once and extract all segments, returning them in playlist order
+    
+    Downloads and extraction run as separate pipeline stages, so the next
+    source downloads while ffmpeg cuts segments from the previous one.
+    """
+    def extract(source):
+        source_file, local_songs, indexes = source
+        try:
+            return [
+                extract_song_segment(source_file, song, i, session_dir, progress)
+                for song, i in zip(local_songs, indexes)
+            ]
+        finally:
+            # Only drops our links; the cache keeps its own copy of each track
+            shutil.rmtree(session_dir / f"song_{indexes[0]}", ignore_errors=True)
+    
+    groups = group_songs(songs)
+    try:
+        groups, group_segments = download_sources(
+            songs, session_dir, [('extract', extract, PIPELINE_EXTRACT_WORKERS)], max_workers, progress
+        )
+    finally:
+        for indexes in groups:
+            shutil.rmtree(session_dir / f"song_{indexes[0]}", ignore_errors=True)
+    
+    segment_files = [None] * len(songs)
+    for indexes, segments in zip(groups, group_segments):
+        for i, segment_file in zip(indexes, segments):
+            segment_files[i] = segment_file
+    return segment_files
+
+def prepare_sources(songs, session_dir, max_workers=MAX_PARALLEL_DOWNLOADS, progress=None):
+    """Download each source once, returning (source_file, song) pairs in playlist order"""
+    _, sources = download_sources(songs, session_dir, max_workers=max_workers, progress=progress)
+    
+    pairs = [None] * len(songs)
+    for source_file, local_songs, indexes in sources:
+        for i, song in zip(indexes, local_songs):
+            pairs[i] = (source_file, song)
+    return pairs
+
+def create_faded_mixtape(segment_files, fade_durations, output_file):
+    """Fade every segment on its own and join them back to back"""
     if len(segment_files) == 1:
         song_info = fade_durations[0]
         segment_duration = get_audio_duration(segment_files[0])
         apply_fades(segment_files[0], output_file, song_info['fadeIn'], song_info['fadeOut'], segment_duration)
         return output_file
     
-    # For now, let's use simple concatenation with proper fades
-    # This ensures audio starts immediately and volume is consistent
     processed_files = []
     
     for i, segment_file in enumerate(segment_files):
@@ -387,7 +2356,7 @@ def create_overlapping_mixtape(segment_files, fade_durations, output_file, overl
         fade_in = song_info['fadeIn']
         fade_out = song_info['fadeOut']
         
-        faded_file = segment_file.parent / f"faded_{i}.mp3"
+        faded_file = intermediate_file(segment_file.parent, f"faded_{i}")
         segment_duration = get_audio_duration(segment_file)
         
         # Apply fades with proper volume
@@ -404,3 +2373,971 @@ def create_overlapping_mixtape(segment_files, fade_durations, output_file, overl
             faded_file.unlink()
     
     return output_file
+
+def render_fade_clip(input_file, output_file, start, duration, direction):
+    """Render input_file[start:start+duration] faded 'in' or 'out' across the whole clip as WAV"""
+    cmd = [
+        'ffmpeg',
+        '-ss', str(start),
+        '-t', str(duration),
+        '-i', str(input_file),
+        '-af', f"{MIX_FORMAT_FILTER},afade=t={direction}:st=0:d={duration}",
+        '-c:a', 'pcm_s16le',
+        '-y',
+        str(output_file)
+    ]
+    
+    result = run_ffmpeg(cmd, 'fade_clip')
+    if result.returncode != 0:
+        raise Exception(f"FFMPEG fade clip failed: {result.stderr}")
+    
+    return output_file
+
+def mix_transition(outgoing_file, incoming_file, outgoing_start, fade_out, fade_in, overlap, output_file):
+    """Fade out the tail of outgoing_file and fade in the head of incoming_file, overlapping them by overlap seconds"""
+    join = f"acrossfade=d={overlap}:c1=nofade:c2=nofade" if overlap > 0 else "concat=n=2:v=0:a=1"
+    cmd = [
+        'ffmpeg',
+        '-ss', str(outgoing_start),
+        '-t', str(fade_out),
+        '-i', str(outgoing_file),
+        '-t', str(fade_in),
+        '-i', str(incoming_file),
+        '-filter_complex',
+        f"[0:a]{MIX_FORMAT_FILTER},afade=t=out:st=0:d={fade_out}[a];"
+        f"[1:a]{MIX_FORMAT_FILTER},afade=t=in:st=0:d={fade_in}[b];"
+        f"[a][b]{join}[out]",
+        '-map', '[out]',
+        '-c:a', 'pcm_s16le',
+        '-y',
+        str(output_file)
+    ]
+    
+    result = run_ffmpeg(cmd, 'crossfade')
+    if result.returncode != 0:
+        raise Exception(f"FFMPEG crossfade failed: {result.stderr}")
+    
+    return output_file
+
+def concatenate_sections(sections, output_file, total_duration=None, progress=None):
+    """Join (file, start, duration) sections with one concat filter and a single MP3 encode
+    
+    start/duration may be None to use the whole file; they are applied as input
+    options so ffmpeg only decodes the part of each file that is used.
+    total_duration (the output length) enables percent updates to progress.
+    """
+    cmd = ['ffmpeg']
+    for file_path, start, duration in sections:
+        if start is not None:
+            cmd.extend(['-ss', str(start)])
+        if duration is not None:
+            cmd.extend(['-t', str(duration)])
+        cmd.extend(['-i', str(file_path)])
+    
+    chains = [f"[{i}:a]{MIX_FORMAT_FILTER}[p{i}]" for i in range(len(sections))]
+    labels = ''.join(f"[p{i}]" for i in range(len(sections)))
+    chains.append(f"{labels}concat=n={len(sections)}:v=0:a=1[out]")
+    
+    cmd.extend([
+        '-filter_complex', ';'.join(chains),
+        '-map', '[out]',
+        '-acodec', 'libmp3lame',
+        '-b:a', '192k',
+        '-ar', '44100',
+        '-ac', '2',
+        '-y',
+        str(output_file)
+    ])
+    
+    result = run_ffmpeg(cmd, 'concat', on_progress=encoding_progress(total_duration, progress))
+    if result.returncode != 0:
+        raise Exception(f"FFMPEG concat failed: {result.stderr}")
+    
+    return output_file
+
+def get_transition_overlaps(durations, fade_durations, overlap_duration):
+    """Overlap for each pair of neighbours: the outgoing fade-out or incoming fade-in, whichever is shorter
+    
+    Capped at overlap_duration and at half of either segment, so no segment is
+    more than half crossfade.
+    """
+    return [
+        max(0, min(
+            overlap_duration, fade_durations[i]['fadeOut'], fade_durations[i + 1]['fadeIn'],
+            durations[i] / 2, durations[i + 1] / 2
+        ))
+        for i in range(len(durations) - 1)
+    ]
+
+def create_overlapping_mixtape(segment_files, fade_durations, output_file, overlap_duration=MAX_CROSSFADE, engine='ffmpeg', progress=None):
+    """Create a mixtape with crossfades between segments
+    
+    Every segment keeps its own fade-in and fade-out, and neighbours overlap
+    by get_transition_overlaps (at most overlap_duration seconds). Only the
+    fade windows are rendered as short clips; the rest of every segment goes
+    straight into the final encode, so the work done per transition doesn't
+    grow with the segment length. With engine='numpy' the segments are mixed
+    in-process instead.
+    """
+    if engine == 'numpy':
+        sections = [(f, None, None) for f in segment_files]
+        return render_mixtape_numpy(sections, fade_durations, output_file, overlap_duration, progress)
+    
+    if len(segment_files) == 1 or overlap_duration <= 0:
+        report_progress(progress, 'fading')
+        return create_faded_mixtape(segment_files, fade_durations, output_file)
+    
+    durations = [get_audio_duration(f) for f in segment_files]
+    overlaps = get_transition_overlaps(durations, fade_durations, overlap_duration)
+    # Each fade is a clip of its own, so a segment's two fades may not overlap each other
+    fade_ins = [max(0, min(f['fadeIn'], d / 2)) for f, d in zip(fade_durations, durations)]
+    fade_outs = [max(0, min(f['fadeOut'], d / 2)) for f, d in zip(fade_durations, durations)]
+    work_dir = output_file.parent
+    last = len(segment_files) - 1
+    
+    sections = []
+    clips = []
+    try:
+        body_start = fade_ins[0]
+        if fade_ins[0] > 0:
+            clip = work_dir / "fade_in_clip.wav"
+            render_fade_clip(segment_files[0], clip, 0, fade_ins[0], 'in')
+            clips.append(clip)
+            sections.append((clip, None, None))
+        
+        for i, segment_file in enumerate(segment_files):
+            body_end = durations[i] - fade_outs[i]
+            if body_end - body_start > 0.001:
+                sections.append((segment_file, body_start, body_end - body_start))
+            
+            if i < last:
+                if fade_outs[i] > 0 or fade_ins[i + 1] > 0:
+                    report_progress(progress, 'fading', transition=i + 1, transitions=len(overlaps))
+                    clip = work_dir / f"transition_{i}.wav"
+                    mix_transition(
+                        segment_file, segment_files[i + 1], body_end,
+                        fade_outs[i], fade_ins[i + 1], overlaps[i], clip
+                    )
+                    clips.append(clip)
+                    sections.append((clip, None, None))
+                body_start = fade_ins[i + 1]
+            elif fade_outs[i] > 0:
+                clip = work_dir / "fade_out_clip.wav"
+                render_fade_clip(segment_file, clip, body_end, fade_outs[i], 'out')
+                clips.append(clip)
+                sections.append((clip, None, None))
+        
+        print(f"🎵 Creating mixtape with {len(segment_files)} tracks and {len(overlaps)} crossfades...")
+        concatenate_sections(sections, output_file, sum(durations) - sum(overlaps), progress)
+    finally:
+        for clip in clips:
+            if clip.exists():
+                clip.unlink()
+    
+    return output_file
+
+def decode_to_pcm(audio_file, start=None, duration=None):
+    """Decode (part of) an audio file to a float32 array of shape (samples, channels)"""
+    cmd = ['ffmpeg']
+    if start is not None:
+        cmd.extend(['-ss', str(start)])
+    if duration is not None:
+        cmd.extend(['-t', str(duration)])
+    cmd.extend([
+        '-i', str(audio_file),
+        '-f', 'f32le',
+        '-ac', str(PCM_CHANNELS),
+        '-ar', str(PCM_SAMPLE_RATE),
+        'pipe:1'
+    ])
+    
+    result = run_ffmpeg(cmd, 'decode', text=False)
+    if result.returncode != 0:
+        raise Exception(f"FFMPEG decode failed: {result.stderr}")
+    
+    return np.frombuffer(result.stdout, dtype='<f4').reshape(-1, PCM_CHANNELS).copy()
+
+def encode_pcm(samples, output_file, progress=None):
+    """Encode a float32 PCM array to MP3 with a single ffmpeg process"""
+    cmd = [
+        'ffmpeg',
+        '-f', 'f32le',
+        '-ar', str(PCM_SAMPLE_RATE),
+        '-ac', str(PCM_CHANNELS),
+        '-i', 'pipe:0',
+        '-acodec', 'libmp3lame',
+        '-b:a', '192k',
+        '-y',
+        str(output_file)
+    ]
+    
+    result = run_ffmpeg(
+        cmd, 'encode',
+        input=samples.astype('<f4').tobytes(),
+        on_progress=encoding_progress(len(samples) / PCM_SAMPLE_RATE, progress)
+    )
+    if result.returncode != 0:
+        raise Exception(f"FFMPEG encode failed: {result.stderr}")
+    
+    return output_file
+
+def apply_gain_ramp(samples, length, direction):
+    """Fade the first ('in') or last ('out') length samples in place with a linear ramp"""
+    length = min(length, len(samples))
+    if length <= 0:
+        return samples
+    ramp = np.linspace(0.0, 1.0, length, endpoint=False, dtype=np.float32)[:, None]
+    if direction == 'in':
+        samples[:length] *= ramp
+    else:
+        samples[-length:] *= ramp[::-1]
+    return samples
+
+def mix_pcm(tracks, fade_durations, overlap_duration=0):
+    """Fade and overlap-add decoded tracks into one PCM array
+    
+    Follows the same rules as the ffmpeg paths: every track gets its own linear
+    fade-in and fade-out, and neighbours overlap by get_transition_overlaps.
+    """
+    durations = [len(t) / PCM_SAMPLE_RATE for t in tracks]
+    overlaps = [int(o * PCM_SAMPLE_RATE) for o in get_transition_overlaps(durations, fade_durations, overlap_duration)]
+    last = len(tracks) - 1
+    
+    total = sum(len(t) for t in tracks) - sum(overlaps)
+    mixed = np.zeros((total, PCM_CHANNELS), dtype=np.float32)
+    
+    position = 0
+    for i, track in enumerate(tracks):
+        song_info = fade_durations[i]
+        apply_gain_ramp(track, int(song_info['fadeIn'] * PCM_SAMPLE_RATE), 'in')
+        apply_gain_ramp(track, int(song_info['fadeOut'] * PCM_SAMPLE_RATE), 'out')
+        
+        mixed[position:position + len(track)] += track
+        position += len(track) - (overlaps[i] if i < last else 0)
+    
+    return np.clip(mixed, -1.0, 1.0, out=mixed)
+
+def render_mixtape_numpy(sections, fade_durations, output_file, overlap_duration=0, progress=None):
+    """Decode (file, start, duration) sections once, mix them with NumPy and encode once"""
+    if not HAS_NUMPY:
+        raise Exception("NumPy not available. Install with: pip install numpy")
+    
+    print(f"🎵 Mixing {len(sections)} tracks with the NumPy engine...")
+    report_progress(progress, 'mixing')
+    tracks = [decode_to_pcm(f, start, duration) for f, start, duration in sections]
+    return encode_pcm(mix_pcm(tracks, fade_durations, overlap_duration), output_file, progress)
+
+def benchmark_mix_engines(segment_files, fade_durations, work_dir, overlap_duration=MAX_CROSSFADE, engines=MIX_ENGINES):
+    """Mix the same segments with each engine and return wall-clock seconds per engine"""
+    timings = {}
+    for engine in engines:
+        output_file = Path(work_dir) / f"benchmark_{engine}.mp3"
+        started = time.perf_counter()
+        create_overlapping_mixtape(segment_files, fade_durations, output_file, overlap_duration, engine=engine)
+        timings[engine] = round(time.perf_counter() - started, 3)
+        output_file.unlink(missing_ok=True)
+    return timings
+
+def build_mixtape_filtergraph(songs, overlap_duration=0):
+    """Build a filter_complex that trims, fades and crossfades every song's (pre-seeked) input
+    
+    Each song gets its own fades; neighbours are overlapped by
+    get_transition_overlaps with acrossfade (which just sums the already faded
+    audio) or concatenated where there is no overlap.
+    """
+    durations = [song['endTime'] - max(0, song['startTime']) for song in songs]
+    last = len(songs) - 1
+    
+    chains = []
+    for i, song in enumerate(songs):
+        duration = durations[i]
+        # The start offset is applied with input-side -ss, so only trim the length here
+        filters = [
+            f"atrim=duration={duration}",
+            "asetpts=PTS-STARTPTS",
+            MIX_FORMAT_FILTER,
+        ]
+        if song['fadeIn'] > 0:
+            filters.append(f"afade=t=in:d={song['fadeIn']}")
+        if song['fadeOut'] > 0:
+            filters.append(f"afade=t=out:st={max(0, duration - song['fadeOut'])}:d={song['fadeOut']}")
+        chains.append(f"[{i}:a]{','.join(filters)}[s{i}]")
+    
+    overlaps = get_transition_overlaps(durations, songs, overlap_duration)
+    if not any(overlaps):
+        labels = ''.join(f"[s{i}]" for i in range(len(songs)))
+        chains.append(f"{labels}concat=n={len(songs)}:v=0:a=1[out]")
+        return ';'.join(chains)
+    
+    current = "[s0]"
+    for i, overlap in enumerate(overlaps, start=1):
+        joined = "[out]" if i == last else f"[x{i}]"
+        if overlap > 0:
+            chains.append(f"{current}[s{i}]acrossfade=d={overlap}:c1=nofade:c2=nofade{joined}")
+        else:
+            chains.append(f"{current}[s{i}]concat=n=2:v=0:a=1{joined}")
+        current = joined
+    return ';'.join(chains)
+
+def render_mixtape_filtergraph(source_files, songs, output_file, overlap_duration=0, progress=None):
+    """Render the whole mixtape from the downloaded sources with a single ffmpeg encode"""
+    cmd = ['ffmpeg']
+    for source_file, song in zip(source_files, songs):
+        cmd.extend(['-ss', str(max(0, song['startTime'])), '-i', str(source_file)])
+    
+    cmd.extend([
+        '-filter_complex', build_mixtape_filtergraph(songs, overlap_duration),
+        '-map', '[out]',
+        '-acodec', 'libmp3lame',
+        '-b:a', '192k',
+        '-ar', '44100',
+        '-ac', '2',
+        '-y',
+        str(output_file)
+    ])
+    
+    durations = [song['endTime'] - max(0, song['startTime']) for song in songs]
+    total_duration = sum(durations) - sum(get_transition_overlaps(durations, songs, overlap_duration))
+    result = run_ffmpeg(cmd, 'render', on_progress=encoding_progress(total_duration, progress))
+    if result.returncode != 0:
+        raise Exception(f"FFMPEG filtergraph render failed: {result.stderr}")
+    
+    if not output_file.exists() or output_file.stat().st_size == 0:
+        raise Exception(f"Output file creation failed: {output_file}")
+    
+    return output_file
+
+def mix_overlap(tail, head):
+    """Sum two runs of f32le samples; whatever is left of the longer one is appended unchanged"""
+    n = min(len(tail), len(head))
+    if HAS_NUMPY:
+        mixed = (np.frombuffer(tail[:n], dtype='<f4') + np.frombuffer(head[:n], dtype='<f4')).astype('<f4').tobytes()
+    else:
+        a, b = array('f', tail[:n]), array('f', head[:n])
+        if sys.byteorder == 'big':
+            a.byteswap()
+            b.byteswap()
+        summed = array('f', (x + y for x, y in zip(a, b)))
+        if sys.byteorder == 'big':
+            summed.byteswap()
+        mixed = summed.tobytes()
+    return mixed + bytes(tail[n:] or head[n:])
+
+def render_mixtape_streaming(source_files, songs, output_file, overlap_duration=0, progress=None, cancel=None):
+    """Render the mixtape through pipes: one decoder per song feeding a single encoder
+    
+    Each decoder trims and fades its song's window to raw PCM on stdout. The
+    crossfades are summed here, holding back only the overlapping tail of the
+    previous song, and everything else is written straight to the encoder's
+    stdin, so no intermediate files are written and encoding starts with the
+    first song. The decoders and the encoder share one governor slot.
+    """
+    durations = [song['endTime'] - max(0, song['startTime']) for song in songs]
+    overlaps = get_transition_overlaps(durations, songs, overlap_duration)
+    frame = 4 * PCM_CHANNELS
+    
+    def pcm_bytes(seconds):
+        return int(seconds * PCM_SAMPLE_RATE) * frame
+    
+    total_bytes = pcm_bytes(sum(durations) - sum(overlaps))
+    last = len(songs) - 1
+    
+    with FFMPEG_GOVERNOR.slot(cancel):
+        threads = ['-threads', str(FFMPEG_GOVERNOR.threads)]
+        encoder_cmd = [
+            'ffmpeg',
+            '-f', 'f32le',
+            '-ar', str(PCM_SAMPLE_RATE),
+            '-ac', str(PCM_CHANNELS),
+            '-i', 'pipe:0',
+        ] + threads + codec_args(output_file) + ['-y', str(output_file)]
+        
+        with ffmpeg_process(encoder_cmd, 'stream_encode', cancel=cancel, stdin=True) as encoder:
+            written = [0]
+            reported = [-1]
+            
+            def write(data):
+                encoder.stdin.write(data)
+                written[0] += len(data)
+                percent = min(100, written[0] * 100 // total_bytes) if total_bytes else 100
+                if percent > reported[0]:
+                    reported[0] = percent
+                    report_progress(progress, 'encoding', percent=percent)
+            
+            tail = b''
+            for i, (source_file, song) in enumerate(zip(source_files, songs)):
+                # Same rules as mix_pcm: every song keeps its own fades, overlaps are summed
+                fade_in, fade_out = song['fadeIn'], song['fadeOut']
+                filters = [MIX_FORMAT_FILTER]
+                if fade_in > 0:
+                    filters.append(f"afade=t=in:d={fade_in}")
+                if fade_out > 0:
+                    filters.append(f"afade=t=out:st={max(0, durations[i] - fade_out)}:d={fade_out}")
+                
+                decoder_cmd = [
+                    'ffmpeg',
+                    '-ss', str(max(0, song['startTime'])),
+                    '-t', str(durations[i]),
+                    '-i', str(source_file),
+                    '-af', ','.join(filters),
+                    '-f', 'f32le',
+                    '-ar', str(PCM_SAMPLE_RATE),
+                    '-ac', str(PCM_CHANNELS),
+                ] + threads + ['pipe:1']
+                
+                head = pcm_bytes(overlaps[i - 1]) if i > 0 else 0
+                hold = pcm_bytes(overlaps[i]) if i < last else 0
+                buffer = bytearray()
+                with ffmpeg_process(decoder_cmd, 'stream_decode', cancel=cancel, stdout=True) as decoder:
+                    while True:
+                        chunk = decoder.stdout.read(STREAM_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        buffer += chunk
+                        if head:
+                            if len(buffer) < head:
+                                continue
+                            write(mix_overlap(tail, buffer[:head]))
+                            del buffer[:head]
+                            head = 0
+                        flush = len(buffer) - hold
+                        flush -= flush % frame
+                        if flush > 0:
+                            write(bytes(buffer[:flush]))
+                            del buffer[:flush]
+                
+                if head:
+                    # The song was shorter than its overlap
+                    write(mix_overlap(tail, buffer))
+                    buffer.clear()
+                tail = bytes(buffer)
+            
+            if tail:
+                write(tail)
+    
+    if not output_file.exists() or output_file.stat().st_size == 0:
+        raise Exception(f"Output file creation failed: {output_file}")
+    
+    return output_file
+
+def render_mixtape(songs, session_dir, output_file, overlap_duration=MAX_CROSSFADE, mode=RENDER_MODE, engine=MIX_ENGINE, progress=None):
+    """Download every song and render the final mixtape
+    
+    With the 'numpy' engine each source is decoded once straight from the
+    selected window and mixed in-process. Otherwise, in 'filtergraph' mode the
+    sources are rendered with one ffmpeg process and a single encode, and in
+    'streaming' mode through piped decoders into one encoder; if that fails,
+    or in 'multipass' mode, segments are extracted and mixed with
+    create_overlapping_mixtape instead. progress(stage, **details) is called
+    as the render moves through downloading, extracting, fading and encoding.
+    """
+    fade_info = [{'fadeIn': song['fadeIn'], 'fadeOut': song['fadeOut']} for song in songs]
+    
+    if engine == 'numpy':
+        try:
+            sections = [
+                (source_file, song['startTime'], song['endTime'] - song['startTime'])
+                for source_file, song in prepare_sources(songs, session_dir, progress=progress)
+            ]
+            return render_mixtape_numpy(sections, fade_info, output_file, overlap_duration, progress)
+        finally:
+            for i in range(len(songs)):
+                shutil.rmtree(session_dir / f"song_{i}", ignore_errors=True)
+    
+    if mode in ('filtergraph', 'streaming'):
+        try:
+            sources = prepare_sources(songs, session_dir, progress=progress)
+            source_files = [source_file for source_file, _ in sources]
+            local_songs = [song for _, song in sources]
+            try:
+                if mode == 'streaming':
+                    print(f"🎵 Streaming {len(songs)} tracks through piped decoders into one encoder...")
+                    return render_mixtape_streaming(source_files, local_songs, output_file, overlap_duration, progress)
+                print(f"🎵 Rendering {len(songs)} tracks in a single ffmpeg pass...")
+                return render_mixtape_filtergraph(source_files, local_songs, output_file, overlap_duration, progress)
+            except Exception as e:
+                print(f"⚠️ Single-pass render failed, falling back to multi-pass: {e}")
+            
+            segment_files = [
+                extract_song_segment(source_file, song, i, session_dir, progress)
+                for i, (source_file, song) in enumerate(sources)
+            ]
+        finally:
+            for i in range(len(songs)):
+                shutil.rmtree(session_dir / f"song_{i}", ignore_errors=True)
+    else:
+        segment_files = prepare_segments(songs, session_dir, progress=progress)
+    
+    try:
+        create_overlapping_mixtape(segment_files, fade_info, output_file, overlap_duration=overlap_duration, progress=progress)
+    finally:
+        for segment_file in segment_files:
+            if segment_file.exists():
+                segment_file.unlink()
+    
+    return output_file
+
+class MixtapeJob:
+    """A queued unit of work and its current state"""
+    
+    def __init__(self, job_id, func, args, kwargs):
+        self.id = job_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.key = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = deque(maxlen=JOB_EVENT_HISTORY)
+        self._seq = 0
+        self._changed = threading.Condition()
+        self.report('queued')
+    
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+    
+    def report(self, stage, **details):
+        """Record a progress event and wake anyone waiting in wait_events"""
+        with self._changed:
+            self._seq += 1
+            self.events.append(dict(details, seq=self._seq, stage=stage, time=time.time()))
+            self._changed.notify_all()
+    
+    def wait_events(self, after=0, timeout=None):
+        """Events with seq > after, waiting up to timeout seconds for one if there are none yet"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._seq > after, timeout)
+            return [event for event in self.events if event['seq'] > after]
+    
+    def to_dict(self):
+        now = time.time()
+        return {
+            'id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at,
+            'queued_for': round((self.started_at or now) - self.created_at, 3),
+            'running_for': round((self.finished_at or now) - self.started_at, 3) if self.started_at else 0.0,
+            'progress': self.events[-1] if self.events else None,
+        }
+
+class JobQueue:
+    """Runs submitted jobs on a fixed pool of background worker threads"""
+    
+    def __init__(self, workers=JOB_WORKERS, history_size=JOB_HISTORY_SIZE):
+        self.workers = max(1, workers)
+        self.history_size = history_size
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._counters = {'submitted': 0, 'deduplicated': 0, 'done': 0, 'failed': 0}
+    
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"mixtape-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(self, func, *args, job_id=None, key=None, **kwargs):
+        """Queue func(*args, **kwargs) and return its MixtapeJob straight away
+        
+        If key matches a job that is still queued or running, that job is
+        returned instead, so repeated submissions don't queue duplicate work.
+        """
+        job = MixtapeJob(job_id or uuid.uuid4().hex, func, args, kwargs)
+        job.key = key
+        with self._lock:
+            if key is not None:
+                for existing in self._jobs.values():
+                    if existing.key == key and not existing.finished:
+                        self._counters['deduplicated'] += 1
+                        return existing
+            self._start_workers()
+            self._jobs[job.id] = job
+            self._counters['submitted'] += 1
+            self._trim_history()
+        self._queue.put(job)
+        return job
+    
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+    
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def is_active(self, job_id):
+        """Whether job_id is queued or running"""
+        job = self.get(job_id)
+        return job is not None and not job.finished
+    
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.status = 'running'
+            job.started_at = time.time()
+            job.report('running')
+            try:
+                job.result = job.func(*job.args, **job.kwargs)
+                job.status = 'done'
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {e}")
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+                with self._lock:
+                    self._counters[job.status] += 1
+                if job.status == 'failed':
+                    job.report('failed', error=job.error)
+                else:
+                    job.report('done')
+                self._queue.task_done()
+    
+    def stats(self):
+        """Queue depth, worker count and job counters"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['running'] = sum(1 for job in self._jobs.values() if job.status == 'running')
+        stats['queued'] = self._queue.qsize()
+        stats['workers'] = self.workers
+        return stats
+
+def _tree_usage(path):
+    """Total size and newest mtime of path and everything under it"""
+    st = path.stat()
+    if not path.is_dir():
+        return st.st_size, st.st_mtime
+    total = 0
+    newest = st.st_mtime
+    for child in path.rglob("*"):
+        try:
+            st = child.stat()
+        except FileNotFoundError:
+            continue
+        newest = max(newest, st.st_mtime)
+        if child.is_file():
+            total += st.st_size
+    return total, newest
+
+class TempDirSweeper:
+    """Background garbage collector for session directories under the temp root
+    
+    Each sweep deletes finished sessions older than the TTL, sessions that never
+    produced a mixtape and have no live job (crashed or abandoned renders), and
+    leftover intermediates next to finished mixtapes; then, while the temp root
+    is over quota, it evicts the oldest finished sessions.
+    """
+    
+    LEFTOVER_PREFIXES = ('download_', 'segment_', 'faded_', 'song_', 'concat_', 'transition_', 'fade_')
+    
+    def __init__(self, root, ttl=TEMP_TTL, quota_bytes=TEMP_QUOTA_BYTES,
+                 interval=TEMP_SWEEP_INTERVAL, orphan_grace=TEMP_ORPHAN_GRACE, is_active=None):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self.interval = interval
+        self.orphan_grace = orphan_grace
+        self.is_active = is_active or (lambda session_id: False)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._counters = {
+            'runs': 0,
+            'expired': 0,
+            'orphaned': 0,
+            'evicted': 0,
+            'leftovers': 0,
+            'bytes_reclaimed': 0,
+            'errors': 0,
+        }
+        self._last_run = {}
+    
+    def start(self):
+        """Start sweeping every interval seconds on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="temp-sweeper", daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Temp sweep failed: {e}")
+            self._stop.wait(self.interval)
+    
+    def _remove(self, path, reason, size):
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
+            self._counters['errors'] += 1
+            return 0
+        self._counters[reason] += 1
+        self._counters['bytes_reclaimed'] += size
+        return size
+    
+    def sweep(self):
+        """Run one collection pass and return what it reclaimed"""
+        started = time.time()
+        with self._lock:
+            reclaimed = 0
+            sessions = []
+            for entry in self.root.iterdir() if self.root.exists() else []:
+                if not entry.is_dir() or self.is_active(entry.name):
+                    continue
+                try:
+                    size, newest = _tree_usage(entry)
+                except FileNotFoundError:
+                    continue
+                age = started - newest
+                
+                if not (entry / "final_mixtape.mp3").exists():
+                    if age > self.orphan_grace:
+                        reclaimed += self._remove(entry, 'orphaned', size)
+                    continue
+                if age > self.ttl:
+                    reclaimed += self._remove(entry, 'expired', size)
+                    continue
+                
+                for leftover in list(entry.iterdir()):
+                    if leftover.name.startswith(self.LEFTOVER_PREFIXES):
+                        leftover_size, _ = _tree_usage(leftover)
+                        reclaimed += self._remove(leftover, 'leftovers', leftover_size)
+                        size -= leftover_size
+                sessions.append((newest, size, entry))
+            
+            total = sum(size for _, size, _ in sessions)
+            for _, size, entry in sorted(sessions):
+                if total <= self.quota_bytes:
+                    break
+                reclaimed += self._remove(entry, 'evicted', size)
+                total -= size
+            
+            self._counters['runs'] += 1
+            self._last_run = {
+                'at': started,
+                'seconds': round(time.time() - started, 3),
+                'bytes_reclaimed': reclaimed,
+                'bytes_in_use': total,
+            }
+            if reclaimed:
+                print(f"🧹 Temp sweep reclaimed {reclaimed / 1024 ** 2:.1f} MB")
+            return dict(self._last_run)
+    
+    def stats(self):
+        """Sweep counters and the result of the last pass"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['last_run'] = dict(self._last_run)
+        stats.update({'ttl': self.ttl, 'quota_bytes': self.quota_bytes})
+        return stats
+
+class TTLCache:
+    """Bounded in-memory LRU cache whose entries expire after ttl seconds"""
+    
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                self._counters['expired'] += 1
+                entry = None
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[1]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+    
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+        stats['max_size'] = self.max_size
+        return stats
+
+class ExtractorPool:
+    """Long-lived yt-dlp YoutubeDL instances shared across requests
+    
+    A YoutubeDL object isn't safe to use from two threads at once, so each
+    caller borrows one exclusively; up to size of them are created on demand.
+    """
+    
+    def __init__(self, size=VIDEO_INFO_EXTRACTORS, options=None):
+        self.size = max(1, size)
+        self.options = options or {'quiet': True, 'no_warnings': True, 'extract_flat': False}
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def extractor(self):
+        """Borrow an extractor for the duration of the with block"""
+        import yt_dlp
+        
+        ydl = None
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                ydl = yt_dlp.YoutubeDL(self.options)
+                self._created += 1
+        if ydl is None:
+            ydl = self._idle.get()
+        try:
+            yield ydl
+        finally:
+            self._idle.put(ydl)
+    
+    def stats(self):
+        return {'size': self.size, 'created': self._created, 'idle': self._idle.qsize()}
+
+VIDEO_INFO_CACHE = TTLCache(VIDEO_INFO_CACHE_SIZE, VIDEO_INFO_TTL)
+VIDEO_INFO_FLIGHTS = SingleFlight()
+EXTRACTOR_POOL = ExtractorPool()
+FAST_EXTRACTOR_POOL = ExtractorPool(options={
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': False,
+    'extractor_args': VIDEO_INFO_FAST_EXTRACTOR_ARGS,
+})
+
+class LatencyStats:
+    """Per-name call counts and latencies"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+    
+    def record(self, name, seconds):
+        with self._lock:
+            entry = self._stats.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                name: {
+                    'count': entry['count'],
+                    'avg_ms': round(entry['total'] / entry['count'] * 1000, 1),
+                    'max_ms': round(entry['max'] * 1000, 1),
+                }
+                for name, entry in self._stats.items()
+            }
+
+VIDEO_INFO_LATENCY = LatencyStats()
+
+def canonical_youtube_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+def extract_video_info(url, fast=VIDEO_INFO_FAST):
+    """Run yt-dlp metadata extraction on a pooled extractor
+    
+    Returns (info, path) where path is 'fast' if the stripped-down extraction
+    (VIDEO_INFO_FAST_EXTRACTOR_ARGS, no format processing) had every field,
+    or 'full' if a normal extraction had to run.
+    """
+    if fast:
+        started = time.perf_counter()
+        try:
+            with FAST_EXTRACTOR_POOL.extractor() as ydl:
+                raw = ydl.extract_info(url, download=False, process=False)
+        except ImportError:
+            raise
+        except Exception as e:
+            # e.g. the web client alone was refused - a full extraction tries the others
+            print(f"⚠️ Fast metadata lookup failed, doing a full extraction: {e}")
+            raw = {}
+        elapsed = time.perf_counter() - started
+        if all(raw.get(field) is not None for field in VIDEO_INFO_FIELDS):
+            VIDEO_INFO_LATENCY.record('fast', elapsed)
+            return {field: raw[field] for field in VIDEO_INFO_FIELDS}, 'fast'
+        VIDEO_INFO_LATENCY.record('fast_incomplete', elapsed)
+    
+    started = time.perf_counter()
+    with EXTRACTOR_POOL.extractor() as ydl:
+        info = ydl.extract_info(url, download=False)
+    VIDEO_INFO_LATENCY.record('full', time.perf_counter() - started)
+    return {
+        'title': info.get('title', 'Unknown Title'),
+        'duration': info.get('duration', 0),
+        'uploader': info.get('uploader', 'Unknown'),
+    }, 'full'
+
+def get_video_info(url):
+    """Title, duration and uploader for a YouTube URL, cached by video ID
+    
+    Concurrent lookups for the same video share one extraction. The returned
+    dict's 'source' says what served it: 'fast', 'full', 'cache' or 'shared'
+    (waited on another request's extraction).
+    """
+    video_id = extract_video_id(url)
+    if video_id is None:
+        info, path = extract_video_info(url)
+        return dict(info, source=path)
+    
+    started = time.perf_counter()
+    info = VIDEO_INFO_CACHE.get(video_id)
+    if info is not None:
+        VIDEO_INFO_LATENCY.record('cache', time.perf_counter() - started)
+        return dict(info, source='cache')
+    
+    def lookup():
+        info, path = extract_video_info(canonical_youtube_url(video_id))
+        VIDEO_INFO_CACHE.put(video_id, info)
+        return info, path
+    
+    (info, path), shared = VIDEO_INFO_FLIGHTS.do(video_id, lookup)
+    return dict(info, source='shared' if shared else path)
+
+def iter_video_info(urls, max_workers=VIDEO_INFO_BATCH_WORKERS):
+    """Look up many URLs concurrently, yielding (index, info, error) as each one finishes"""
+    if not urls:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as executor:
+        futures = {executor.submit(get_video_info, url): i for i, url in enumerate(urls)}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+def get_video_info_stats():
+    """Metadata cache, extractor pool and coalescing counters"""
+    stats = VIDEO_INFO_CACHE.stats()
+    stats['coalesced'] = VIDEO_INFO_FLIGHTS.coalesced
+    stats['extractors'] = EXTRACTOR_POOL.stats()
+    stats['fast_extractors'] = FAST_EXTRACTOR_POOL.stats()
+    stats['latency'] = VIDEO_INFO_LATENCY.stats()
+    return stats